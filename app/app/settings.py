@@ -11,6 +11,7 @@ https://docs.djangoproject.com/en/3.0/ref/settings/
 """
 
 import os
+import sys
 
 # Build paths inside the project like this: os.path.join(BASE_DIR, ...)
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
@@ -20,12 +21,17 @@ BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 # See https://docs.djangoproject.com/en/3.0/howto/deployment/checklist/
 
 # SECURITY WARNING: keep the secret key used in production secret!
-SECRET_KEY = 'zopr-)6_wn76nx4cggh-o%#8f9#+x64h^q$yvdg8-d$$3n^riv'
+SECRET_KEY = os.environ.get(
+    'SECRET_KEY',
+    'zopr-)6_wn76nx4cggh-o%#8f9#+x64h^q$yvdg8-d$$3n^riv'
+)
 
 # SECURITY WARNING: don't run with debug turned on in production!
-DEBUG = True
+DEBUG = os.environ.get('DEBUG', '1') == '1'
 
-ALLOWED_HOSTS = []
+ALLOWED_HOSTS = [
+    host for host in os.environ.get('ALLOWED_HOSTS', '').split(',') if host
+]
 
 
 # Application definition
@@ -47,6 +53,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'core.middleware.MetricsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -82,11 +89,39 @@ WSGI_APPLICATION = 'app.wsgi.application'
 
 DATABASES = {
     'default': {
-        'ENGINE': 'django.db.backends.postgresql',
+        'ENGINE': os.environ.get('DB_ENGINE', 'django.db.backends.postgresql'),
         'HOST' : os.environ.get('DB_HOST'),
         'NAME' : os.environ.get('DB_NAME'),
         'USER' : os.environ.get('DB_USER'),
         'PASSWORD' : os.environ.get('DB_PASS'), 
+        # seconds to keep a connection open between requests, None for
+        # unlimited; use 0 with the pooled core.db.backends.postgresql_pool
+        'CONN_MAX_AGE': None if os.environ.get('DB_CONN_MAX_AGE') == 'None'
+        else int(os.environ.get('DB_CONN_MAX_AGE', 60)),
+        # ping persistent connections at the start of each request
+        'CONN_HEALTH_CHECKS': os.environ.get('DB_CONN_HEALTH_CHECKS') == '1',
+        # only used by core.db.backends.postgresql_pool
+        'POOL': {
+            'MAX_SIZE': int(os.environ.get('DB_POOL_MAX_SIZE', 10)),
+            'TIMEOUT': float(os.environ.get('DB_POOL_TIMEOUT', 30)),
+            'CHECK_AFTER': float(os.environ.get('DB_POOL_CHECK_AFTER', 30)),
+        },
+    }
+}
+
+
+# Caches. The default in-process LocMemCache is private to each worker;
+# multi-worker deployments need a shared backend such as memcached for
+# cache invalidations (tokens, responses, throttling) to reach every
+# worker
+
+CACHES = {
+    'default': {
+        'BACKEND': os.environ.get(
+            'CACHE_BACKEND',
+            'django.core.cache.backends.locmem.LocMemCache'
+        ),
+        'LOCATION': os.environ.get('CACHE_LOCATION', ''),
     }
 }
 
@@ -110,6 +145,38 @@ AUTH_PASSWORD_VALIDATORS = [
 ]
 
 
+# Password hashing. New passwords are hashed with the PASSWORD_HASHER
+# policy ('argon2', 'bcrypt' or 'pbkdf2'), the other hashers only check
+# existing hashes, which are rehashed with the policy on the next login
+
+PASSWORD_HASHING = {
+    'POLICY': os.environ.get('PASSWORD_HASHER', 'argon2'),
+    'ARGON2_TIME_COST': int(os.environ.get('ARGON2_TIME_COST', 2)),
+    'ARGON2_MEMORY_COST': int(os.environ.get('ARGON2_MEMORY_COST', 19456)),
+    'ARGON2_PARALLELISM': int(os.environ.get('ARGON2_PARALLELISM', 1)),
+    'BCRYPT_ROUNDS': int(os.environ.get('BCRYPT_ROUNDS', 10)),
+}
+
+PASSWORD_HASHER_POLICIES = {
+    'argon2': 'core.hashers.TunedArgon2PasswordHasher',
+    'bcrypt': 'core.hashers.TunedBCryptSHA256PasswordHasher',
+    'pbkdf2': 'django.contrib.auth.hashers.PBKDF2PasswordHasher',
+}
+
+PASSWORD_HASHERS = [
+    PASSWORD_HASHER_POLICIES[PASSWORD_HASHING['POLICY']],
+    *(
+        hasher for policy, hasher in PASSWORD_HASHER_POLICIES.items()
+        if policy != PASSWORD_HASHING['POLICY']
+    ),
+    'django.contrib.auth.hashers.PBKDF2SHA1PasswordHasher',
+]
+
+# the test suite creates users by the hundred, a fast hash is enough there
+if sys.argv[1:2] == ['test']:
+    PASSWORD_HASHERS = ['django.contrib.auth.hashers.MD5PasswordHasher']
+
+
 # Internationalization
 # https://docs.djangoproject.com/en/3.0/topics/i18n/
 
@@ -131,6 +198,120 @@ STATIC_URL = '/static/'
 MEDIA_URL = '/media/'
 
 MEDIA_ROOT = '/vol/web/media'
-STATIC_ROT = '/vol/web/static'
+STATIC_ROOT = '/vol/web/static'
 
 AUTH_USER_MODEL = 'core.User'
+
+
+# Token authentication cache
+
+TOKEN_AUTH_CACHE = {
+    'CACHE_ALIAS': os.environ.get('TOKEN_AUTH_CACHE_ALIAS', 'default'),
+    'TIMEOUT': int(os.environ.get('TOKEN_AUTH_CACHE_TIMEOUT', 300)),
+    'LOCAL_TIMEOUT': int(os.environ.get('TOKEN_AUTH_CACHE_LOCAL_TIMEOUT', 5)),
+    'LOCAL_MAX_ENTRIES': int(
+        os.environ.get('TOKEN_AUTH_CACHE_LOCAL_MAX_ENTRIES', 10000)
+    ),
+}
+
+
+# Lifetime of the API tokens in seconds, 0 for tokens that never expire
+
+TOKEN_TTL = int(os.environ.get('TOKEN_TTL', 7 * 24 * 60 * 60))
+
+
+# Token bucket throttling of the login and sign up endpoints, by client
+# IP and by submitted email. BACKEND is either 'local' (per process) or
+# 'django' (the CACHE_ALIAS cache, shared between processes when CACHES
+# uses a shared backend)
+
+LOGIN_THROTTLE = {
+    'ENABLED': os.environ.get('LOGIN_THROTTLE_ENABLED', '1') == '1',
+    'BACKEND': os.environ.get('LOGIN_THROTTLE_BACKEND', 'local'),
+    'CACHE_ALIAS': os.environ.get('LOGIN_THROTTLE_CACHE_ALIAS', 'default'),
+    'MAX_ENTRIES': int(os.environ.get('LOGIN_THROTTLE_MAX_ENTRIES', 100000)),
+    'IP_BURST': int(os.environ.get('LOGIN_THROTTLE_IP_BURST', 30)),
+    'IP_PER_MINUTE': int(os.environ.get('LOGIN_THROTTLE_IP_PER_MINUTE', 30)),
+    'EMAIL_BURST': int(os.environ.get('LOGIN_THROTTLE_EMAIL_BURST', 5)),
+    'EMAIL_PER_MINUTE': int(
+        os.environ.get('LOGIN_THROTTLE_EMAIL_PER_MINUTE', 2)
+    ),
+}
+
+REST_FRAMEWORK = {
+    # proxies in front of the app, whose X-Forwarded-For entries are
+    # trusted to find the client IP; 0 uses the peer address
+    'NUM_PROXIES': int(os.environ.get('NUM_PROXIES', 0)),
+}
+
+
+# Rendered responses of the recipe list endpoints, per user. BACKEND is
+# either 'local' (in-process LRU) or 'django' (the CACHE_ALIAS cache).
+# Writes only invalidate the responses of other workers through a cache
+# shared between them, see CACHES; otherwise, as with 'local', the other
+# workers may serve stale responses for up to TIMEOUT seconds
+
+RESPONSE_CACHE = {
+    'BACKEND': os.environ.get('RESPONSE_CACHE_BACKEND', 'django'),
+    'CACHE_ALIAS': os.environ.get('RESPONSE_CACHE_ALIAS', 'default'),
+    'TIMEOUT': int(os.environ.get('RESPONSE_CACHE_TIMEOUT', 300)),
+    'MAX_ENTRIES': int(os.environ.get('RESPONSE_CACHE_MAX_ENTRIES', 1024)),
+}
+
+
+# Bulk endpoints
+
+BULK_BATCH_SIZE = int(os.environ.get('BULK_BATCH_SIZE', 1000))
+BULK_MAX_ITEMS = int(os.environ.get('BULK_MAX_ITEMS', 5000))
+
+
+# Render recipes from .values() rows instead of model instances
+
+RECIPE_FAST_SERIALIZATION = \
+    os.environ.get('RECIPE_FAST_SERIALIZATION') == '1'
+RECIPE_EXPORT_CHUNK_SIZE = int(
+    os.environ.get('RECIPE_EXPORT_CHUNK_SIZE', 2000)
+)
+
+
+# Background tasks
+
+TASK_WORKERS = int(os.environ.get('TASK_WORKERS', 2))
+TASKS_ALWAYS_EAGER = os.environ.get('TASKS_ALWAYS_EAGER') == '1'
+
+
+# Request metrics, see core.middleware
+
+METRICS = {
+    'ENABLED': os.environ.get('METRICS_ENABLED', '1') == '1',
+    'SERVER_TIMING': os.environ.get('METRICS_SERVER_TIMING', '1') == '1',
+    'SAMPLES': int(os.environ.get('METRICS_SAMPLES', 1000)),
+    'DUPLICATE_QUERIES':
+        os.environ.get('METRICS_DUPLICATE_QUERIES') == '1',
+    'DUPLICATE_THRESHOLD':
+        int(os.environ.get('METRICS_DUPLICATE_THRESHOLD', 2)),
+}
+
+
+# ASGI serving, see core.asgi
+
+ASGI_THREADS = int(os.environ.get('ASGI_THREADS', 32))
+ASGI_MAX_PENDING = int(os.environ.get('ASGI_MAX_PENDING', 2000))
+
+
+# Recipe image processing
+
+RECIPE_IMAGE_FORMAT = os.environ.get('RECIPE_IMAGE_FORMAT', 'JPEG')
+RECIPE_IMAGE_QUALITY = int(os.environ.get('RECIPE_IMAGE_QUALITY', 80))
+RECIPE_IMAGE_MAX_BYTES = int(
+    os.environ.get('RECIPE_IMAGE_MAX_BYTES', 20 * 1024 * 1024)
+)
+RECIPE_IMAGE_MAX_PIXELS = int(
+    os.environ.get('RECIPE_IMAGE_MAX_PIXELS', 40 * 1000 * 1000)
+)
+# seconds after which an unfinished chunked upload is deleted
+RECIPE_UPLOAD_EXPIRY = int(os.environ.get('RECIPE_UPLOAD_EXPIRY', 24 * 3600))
+RECIPE_IMAGE_VARIANTS = {
+    'thumbnail': (200, 200),
+    'medium': (800, 800),
+}
@@ -0,0 +1,146 @@
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core import signals
+from django.core.exceptions import RequestAborted
+from django.core.handlers.asgi import ASGIHandler
+from django.db import close_old_connections
+from django.http import FileResponse, HttpResponse
+from django.urls import set_script_prefix
+
+
+class ThreadPoolASGIHandler(ASGIHandler):
+    """ASGI handler running the synchronous views on a bounded thread pool
+
+    The event loop holds every in-flight request, reading bodies and
+    writing responses, while at most ASGI_THREADS of them run Django at
+    once. Streaming responses are iterated on a worker thread as well,
+    never on the event loop where database access is not allowed.
+    Requests beyond ASGI_MAX_PENDING waiting ones get a 503.
+    """
+
+    def __init__(self, threads=None, max_pending=None):
+        super().__init__()
+        self.threads = threads or settings.ASGI_THREADS
+        self.max_pending = settings.ASGI_MAX_PENDING \
+            if max_pending is None else max_pending
+        self.executor = ThreadPoolExecutor(
+            max_workers=self.threads,
+            thread_name_prefix='asgi'
+        )
+        # only touched from the event loop
+        self.in_flight = 0
+
+    def run_sync(self, scope, body_file):
+        """Build the response of a request on a worker thread"""
+        set_script_prefix(self.get_script_prefix(scope))
+        signals.request_started.send(sender=self.__class__, scope=scope)
+        request, response = self.create_request(scope, body_file)
+        if request is not None:
+            response = self.get_response(request)
+        if not response.streaming:
+            # what request_finished does, on the thread owning the
+            # connections; streaming responses do it once exhausted
+            close_old_connections()
+
+        return response
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http':
+            raise ValueError(
+                'Django can only handle ASGI/HTTP connections, not %s.'
+                % scope['type']
+            )
+        if self.in_flight >= self.threads + self.max_pending:
+            response = HttpResponse('503 Service Unavailable', status=503)
+            response['Retry-After'] = '1'
+            await self.send_response(response, send)
+            return
+
+        self.in_flight += 1
+        try:
+            try:
+                body_file = await self.read_body(receive)
+            except RequestAborted:
+                return
+            response = await asyncio.get_running_loop().run_in_executor(
+                self.executor,
+                self.run_sync,
+                scope,
+                body_file
+            )
+            response._handler_class = self.__class__
+            if isinstance(response, FileResponse):
+                response.block_size = self.chunk_size
+            await self.send_response(response, send)
+        finally:
+            self.in_flight -= 1
+
+    async def send_response(self, response, send):
+        """Send a response, iterating streaming ones on a worker thread"""
+        if not response.streaming:
+            await super().send_response(response, send)
+            return
+
+        headers = [
+            (str(header).encode('ascii'), str(value).encode('latin1'))
+            for header, value in response.items()
+        ] + [
+            (b'Set-Cookie', c.output(header='').encode('ascii').strip())
+            for c in response.cookies.values()
+        ]
+        await send({
+            'type': 'http.response.start',
+            'status': response.status_code,
+            'headers': headers,
+        })
+        parts = self.iterate(response)
+        try:
+            async for part in parts:
+                for chunk, _ in self.chunk_bytes(part):
+                    await send({
+                        'type': 'http.response.body',
+                        'body': chunk,
+                        'more_body': True,
+                    })
+        finally:
+            await parts.aclose()
+        await send({'type': 'http.response.body'})
+
+    async def iterate(self, response, buffered=2):
+        """Yield the parts of a streaming response produced on a thread
+
+        At most `buffered` parts are produced ahead of the client.
+        """
+        loop = asyncio.get_running_loop()
+        parts = asyncio.Queue()
+        slots = threading.Semaphore(buffered)
+        stopped = threading.Event()
+        end = object()
+
+        def produce():
+            try:
+                for part in response:
+                    slots.acquire()
+                    if stopped.is_set():
+                        break
+                    loop.call_soon_threadsafe(parts.put_nowait, part)
+            finally:
+                response.close()
+                loop.call_soon_threadsafe(parts.put_nowait, end)
+
+        producer = loop.run_in_executor(self.executor, produce)
+        try:
+            while True:
+                part = await parts.get()
+                if part is end:
+                    break
+                slots.release()
+                yield part
+        finally:
+            # let the producer stop if the client went away
+            stopped.set()
+            slots.release()
+            await producer
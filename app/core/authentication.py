@@ -0,0 +1,163 @@
+import hashlib
+from datetime import timedelta
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import caches
+from django.db import router, transaction
+from django.utils import timezone
+from django.utils.translation import gettext_lazy as _
+
+from rest_framework import exceptions
+from rest_framework.authentication import TokenAuthentication
+from rest_framework.authtoken.models import Token
+
+from core.cache import LRUCache
+
+
+local_token_cache = LRUCache(
+    max_entries=settings.TOKEN_AUTH_CACHE['LOCAL_MAX_ENTRIES'],
+    timeout=settings.TOKEN_AUTH_CACHE['LOCAL_TIMEOUT'],
+)
+
+
+def token_cache_key(key):
+    """Return the cache key for a token without exposing the token itself"""
+    digest = hashlib.sha256(key.encode()).hexdigest()
+
+    return f'authtoken:{digest}'
+
+
+def shared_token_cache():
+    """Return the cache backend shared between worker processes
+
+    It is only shared if CACHES configures a shared backend, otherwise
+    revoked tokens stay valid in the other processes until TIMEOUT.
+    """
+    return caches[settings.TOKEN_AUTH_CACHE['CACHE_ALIAS']]
+
+
+def token_cache_entry(token):
+    """Return the cached form of a token and its user, without password"""
+    user = token.user
+
+    return (token.key, token.created, {
+        field.attname: getattr(user, field.attname)
+        for field in user._meta.concrete_fields
+        if field.attname != 'password'
+    })
+
+
+def token_from_cache_entry(entry):
+    """Rebuild a token and its user from their cached form
+
+    The password of the user is deferred, loaded on first access and
+    left alone when the user is saved.
+    """
+    key, created, values = entry
+    user_model = get_user_model()
+    user = user_model.from_db(
+        router.db_for_read(user_model),
+        list(values),
+        list(values.values())
+    )
+    token = Token.from_db(
+        router.db_for_read(Token),
+        ['key', 'user_id', 'created'],
+        [key, user.pk, created]
+    )
+    token.user = user
+
+    return token
+
+
+def invalidate_token(key):
+    """Drop a token from the local and shared caches"""
+    cache_key = token_cache_key(key)
+    local_token_cache.delete(cache_key)
+    shared_token_cache().delete(cache_key)
+
+
+def token_expires(token):
+    """Return when a token expires, None if tokens never expire"""
+    if not settings.TOKEN_TTL:
+        return None
+
+    return token.created + timedelta(seconds=settings.TOKEN_TTL)
+
+
+def token_expired(token):
+    """Return whether a token is past its lifetime"""
+    expires = token_expires(token)
+
+    return expires is not None and expires <= timezone.now()
+
+
+def issue_token(user):
+    """Return the token of user, replacing it first if it expired"""
+    with transaction.atomic():
+        token, created = Token.objects.get_or_create(user=user)
+        if not created and token_expired(token):
+            # a concurrent login may have replaced it already
+            Token.objects.filter(pk=token.pk).delete()
+            token, created = Token.objects.get_or_create(user=user)
+
+    return token
+
+
+def rotate_token(token):
+    """Replace a token by a new one of the same user and return it"""
+    with transaction.atomic():
+        deleted = Token.objects.filter(pk=token.pk).delete()[0]
+        if not deleted:
+            raise exceptions.AuthenticationFailed(_('Invalid token.'))
+
+        return Token.objects.create(user=token.user)
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    """Token authentication that caches the token and its user
+
+    Tokens are looked up in a small in-process LRU first, then in the
+    CACHE_ALIAS cache and only then in the database. The caches hold the
+    token and the user's fields but never the password hash. Entries are
+    invalidated when the token is deleted or its user is saved; the local
+    LRU of other processes expires after TOKEN_AUTH_CACHE['LOCAL_TIMEOUT'].
+    Tokens older than TOKEN_TTL are rejected from their cached creation
+    time, without a query.
+    """
+
+    def cache_timeout(self, token):
+        """Return how long to cache a token, at most until it expires"""
+        timeout = settings.TOKEN_AUTH_CACHE['TIMEOUT']
+        expires = token_expires(token)
+        if expires is None:
+            return timeout
+
+        remaining = (expires - timezone.now()).total_seconds()
+        return max(1, min(timeout, int(remaining)))
+
+    def authenticate_credentials(self, key):
+        """Return the (user, token) pair for key, using the caches"""
+        cache_key = token_cache_key(key)
+        entry = local_token_cache.get(cache_key)
+        if entry is None:
+            shared_cache = shared_token_cache()
+            entry = shared_cache.get(cache_key)
+            if entry is None:
+                user, token = super().authenticate_credentials(key)
+                entry = token_cache_entry(token)
+                shared_cache.set(
+                    cache_key,
+                    entry,
+                    self.cache_timeout(token)
+                )
+            local_token_cache.set(cache_key, entry)
+
+        # a fresh instance per request, nothing shared between requests
+        token = token_from_cache_entry(entry)
+        if token_expired(token):
+            invalidate_token(key)
+            raise exceptions.AuthenticationFailed(_('Token has expired.'))
+
+        return (token.user, token)
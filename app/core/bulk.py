@@ -0,0 +1,62 @@
+from django.conf import settings
+from django.db import connections, router
+from django.utils import timezone
+
+
+def bulk_create(model, objs, batch_size=None):
+    """Insert objs in batches and make sure each one gets its primary key
+
+    Backends that cannot return ids from a bulk insert fall back to one
+    insert per object.
+    """
+    batch_size = batch_size or settings.BULK_BATCH_SIZE
+    connection = connections[router.db_for_write(model)]
+    if connection.features.can_return_rows_from_bulk_insert:
+        return model.objects.bulk_create(objs, batch_size=batch_size)
+
+    for obj in objs:
+        obj.save(force_insert=True)
+
+    return objs
+
+
+def bulk_link(model, field_name, links, batch_size=None):
+    """Insert (object pk, related pk) pairs into a many to many table
+
+    Repeated pairs are inserted once, like RelatedManager.set() does.
+    """
+    field = model._meta.get_field(field_name)
+    through = field.remote_field.through
+    source = f'{field.m2m_field_name()}_id'
+    target = f'{field.m2m_reverse_field_name()}_id'
+
+    through.objects.bulk_create(
+        [through(**{source: pk, target: related_pk})
+         for pk, related_pk in dict.fromkeys(links)],
+        batch_size=batch_size or settings.BULK_BATCH_SIZE
+    )
+
+
+def bulk_unlink(model, field_name, pks):
+    """Remove every many to many link of the objects with pks"""
+    field = model._meta.get_field(field_name)
+    through = field.remote_field.through
+
+    through.objects.filter(
+        **{f'{field.m2m_field_name()}_id__in': pks}
+    ).delete()
+
+
+def touch_linked(model, pks):
+    """Bump `modified` on the objects linked to pks through any M2M"""
+    now = timezone.now()
+    for field in model._meta.get_fields():
+        if not field.many_to_many:
+            continue
+        if field.auto_created:
+            lookup = f'{field.field.name}__in'
+        else:
+            lookup = f'{field.related_query_name()}__in'
+        field.related_model.objects.filter(**{lookup: pks}).update(
+            modified=now
+        )
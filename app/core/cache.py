@@ -0,0 +1,121 @@
+import hashlib
+import threading
+import time
+import uuid
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import caches
+
+
+class LRUCache:
+    """Thread safe in-process LRU cache with a per entry time to live"""
+
+    def __init__(self, max_entries=1024, timeout=300):
+        self.max_entries = max_entries
+        self.timeout = timeout
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        """Return the value stored for key if it has not expired"""
+        with self._lock:
+            try:
+                expires, value = self._data[key]
+            except KeyError:
+                return default
+            if expires < time.monotonic():
+                del self._data[key]
+                return default
+            self._data.move_to_end(key)
+
+            return value
+
+    def set(self, key, value, timeout=None):
+        """Store a value, evicting the least recently used entries"""
+        if timeout is None:
+            timeout = self.timeout
+        with self._lock:
+            self._data[key] = (time.monotonic() + timeout, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+
+    def delete(self, key):
+        """Remove key from the cache if present"""
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        """Remove every entry from the cache"""
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+
+class ResponseCache:
+    """Per user cache of rendered responses
+
+    Keys embed a generation token per user, so replacing the token
+    invalidates every cached response of that user at once. Only the
+    processes sharing the backend see the new generation; the others
+    keep their responses until TIMEOUT.
+    """
+
+    def __init__(self, config):
+        self.config = config
+        self._local = LRUCache(
+            max_entries=config['MAX_ENTRIES'],
+            timeout=config['TIMEOUT']
+        )
+
+    @property
+    def backend(self):
+        """Return the configured cache backend"""
+        if self.config['BACKEND'] == 'local':
+            return self._local
+
+        return caches[self.config['CACHE_ALIAS']]
+
+    def _generation_key(self, user_pk):
+        """Return the key holding the generation token of a user"""
+        return f'responses:{user_pk}:generation'
+
+    def generation(self, user_pk):
+        """Return the current generation token of a user"""
+        key = self._generation_key(user_pk)
+        generation = self.backend.get(key)
+        if generation is None:
+            generation = self.invalidate(user_pk)
+
+        return generation
+
+    def invalidate(self, user_pk):
+        """Start a new generation for a user and return its token"""
+        generation = uuid.uuid4().hex
+        self.backend.set(
+            self._generation_key(user_pk),
+            generation,
+            self.config['TIMEOUT']
+        )
+
+        return generation
+
+    def make_key(self, user_pk, *parts):
+        """Return the key of a response of user for parts"""
+        digest = hashlib.md5(repr(parts).encode()).hexdigest()
+
+        return f'responses:{user_pk}:{self.generation(user_pk)}:{digest}'
+
+    def get(self, key):
+        """Return the response cached under key, if any"""
+        return self.backend.get(key)
+
+    def set(self, key, value):
+        """Cache a response under key"""
+        self.backend.set(key, value, self.config['TIMEOUT'])
+
+
+response_cache = ResponseCache(settings.RESPONSE_CACHE)
@@ -0,0 +1,69 @@
+from django.db.backends.postgresql import base
+from psycopg2 import extensions
+
+from core.db.pool import ConnectionPool, get_pool
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    """PostgreSQL backend reusing connections from a per process pool
+
+    Closing the connection gives it back to the pool, so CONN_MAX_AGE
+    should be 0: every request then borrows a warm connection instead of
+    opening one. The pool is configured by the POOL dict of the database
+    settings, see app/settings.py.
+    """
+
+    def _create_pool(self, conn_params):
+        options = self.settings_dict.get('POOL', {})
+
+        return ConnectionPool(
+            connect=lambda: super(DatabaseWrapper, self).get_new_connection(
+                conn_params
+            ),
+            check=self._check_connection,
+            reset=self._reset_connection,
+            max_size=options.get('MAX_SIZE', 10),
+            timeout=options.get('TIMEOUT', 30),
+            check_after=options.get('CHECK_AFTER', 30),
+        )
+
+    @property
+    def pool(self):
+        conn_params = self.get_connection_params()
+
+        return get_pool(
+            self.alias,
+            conn_params,
+            lambda: self._create_pool(conn_params)
+        )
+
+    def get_new_connection(self, conn_params):
+        # connections go back to the pool they came from, even once the
+        # settings changed
+        self.connection_pool = self.pool
+        return self.connection_pool.get()
+
+    def _close(self):
+        if self.connection is None:
+            return
+        if self.in_atomic_block:
+            # close() keeps self.connection set inside atomic blocks, so
+            # the connection must not be handed to another thread
+            self.connection_pool.discard(self.connection)
+        else:
+            self.connection_pool.put(self.connection)
+
+    @staticmethod
+    def _check_connection(connection):
+        """Raise if connection cannot run a query anymore"""
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT 1')
+
+    @staticmethod
+    def _reset_connection(connection):
+        """Roll back whatever the previous user left open"""
+        if connection.closed:
+            raise base.Database.InterfaceError('connection already closed')
+        if connection.get_transaction_status() != \
+                extensions.TRANSACTION_STATUS_IDLE:
+            connection.rollback()
@@ -0,0 +1,115 @@
+import os
+import threading
+import time
+
+from django.db.utils import OperationalError
+
+
+class ConnectionPool:
+    """Bounded pool of raw database connections for one process
+
+    `connect` opens a new connection, `check` raises if an idle
+    connection is no longer usable and `reset` prepares a returned one
+    for its next user. Idle connections older than `check_after` seconds
+    are checked before being handed out again, stale ones are discarded.
+    """
+
+    def __init__(self, connect, check, reset, max_size=10, timeout=30,
+                 check_after=30):
+        self.connect = connect
+        self.check = check
+        self.reset = reset
+        self.max_size = max_size
+        self.timeout = timeout
+        self.check_after = check_after
+        self.size = 0
+        self.idle = []
+        self.condition = threading.Condition()
+
+    def get(self):
+        """Return an idle connection, a new one, or wait for a free one"""
+        deadline = time.monotonic() + self.timeout
+        while True:
+            with self.condition:
+                while not self.idle and self.size >= self.max_size:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0 or not self.condition.wait(remaining):
+                        raise OperationalError(
+                            f'No free connection in the pool after '
+                            f'{self.timeout:g} seconds.'
+                        )
+                if not self.idle:
+                    self.size += 1
+                    break
+                connection, released = self.idle.pop()
+
+            if time.monotonic() - released < self.check_after:
+                return connection
+            try:
+                self.check(connection)
+                return connection
+            except Exception:
+                self.discard(connection)
+
+        try:
+            return self.connect()
+        except Exception:
+            self.discard(None)
+            raise
+
+    def put(self, connection):
+        """Give a connection back to the pool, discarding it if unusable"""
+        try:
+            self.reset(connection)
+        except Exception:
+            self.discard(connection)
+            return
+
+        with self.condition:
+            self.idle.append((connection, time.monotonic()))
+            self.condition.notify()
+
+    def discard(self, connection):
+        """Close connection and free its slot in the pool"""
+        if connection is not None:
+            try:
+                connection.close()
+            except Exception:
+                pass
+        with self.condition:
+            self.size -= 1
+            self.condition.notify()
+
+    def clear(self):
+        """Close every idle connection"""
+        with self.condition:
+            idle, self.idle = self.idle, []
+        for connection, _ in idle:
+            self.discard(connection)
+
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def get_pool(alias, params, factory):
+    """Return the pool of alias in this process, creating it with factory
+
+    Pools are keyed by process id so forked workers never share the
+    sockets of their parent. When the connection params of alias change,
+    like the test runner switching NAME to the test database, the idle
+    connections of the old pool are closed and a new pool is created.
+    """
+    key = (alias, os.getpid())
+    params = repr(sorted(params.items()))
+    with _pools_lock:
+        current = _pools.get(key)
+        if current is not None and current[0] == params:
+            return current[1]
+        pool = factory()
+        _pools[key] = (params, pool)
+
+    if current is not None:
+        current[1].clear()
+
+    return pool
@@ -0,0 +1,293 @@
+import csv
+import io
+import json
+import os
+import sys
+import time
+from itertools import islice
+
+from django.contrib.auth import get_user_model
+from django.core.exceptions import ValidationError
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+
+from core.bulk import bulk_create, bulk_link, touch_linked
+from core.models import Tag, Ingredient, Recipe
+from core.signals import invalidate_responses
+from recipe.search import refresh_search
+
+
+RECIPE_FIELDS = ('title', 'time_minutes', 'price', 'link')
+RELATED_MODELS = {'tags': Tag, 'ingredients': Ingredient}
+
+
+def read_csv(stream):
+    """Yield CSV records, tag and ingredient names separated by `;`"""
+    for record in csv.DictReader(stream):
+        for field in RELATED_MODELS:
+            record[field] = (record.get(field) or '').split(';')
+        yield record
+
+
+def read_ndjson(stream):
+    """Yield the records of a newline delimited JSON stream"""
+    for line in stream:
+        if line.strip():
+            yield json.loads(line)
+
+
+READERS = {
+    'csv': read_csv,
+    'ndjson': read_ndjson,
+}
+
+
+def copy_escape(value):
+    """Return value in the text format of COPY FROM"""
+    if value is None:
+        return '\\N'
+
+    return str(value).replace('\\', '\\\\').replace('\t', '\\t') \
+        .replace('\n', '\\n').replace('\r', '\\r')
+
+
+def copy_rows(cursor, table, columns, rows):
+    """Load rows into the columns of table with COPY FROM STDIN"""
+    buffer = io.StringIO()
+    for row in rows:
+        buffer.write('\t'.join(copy_escape(value) for value in row))
+        buffer.write('\n')
+    buffer.seek(0)
+
+    quote = connection.ops.quote_name
+    cursor.copy_expert(
+        f'COPY {quote(table)} ({", ".join(map(quote, columns))}) '
+        f'FROM STDIN',
+        buffer
+    )
+
+
+class NameMap:
+    """In memory map of the tag or ingredient names of users to ids"""
+
+    def __init__(self, model):
+        self.model = model
+        self.name_field = model._meta.get_field('name')
+        self.ids = {}
+
+    def user_ids(self, user_pk):
+        """Return the name -> id map of a user, loading it on first use"""
+        if user_pk not in self.ids:
+            # the oldest object wins when a user has duplicate names
+            self.ids[user_pk] = dict(
+                self.model.objects.filter(user_id=user_pk)
+                .order_by('-id').values_list('name', 'id')
+            )
+
+        return self.ids[user_pk]
+
+    def clean(self, names):
+        """Return the distinct valid names out of names, in order"""
+        names = (str(name).strip() for name in names or ())
+
+        return list(dict.fromkeys(
+            self.name_field.clean(name, None) for name in names if name
+        ))
+
+    def create_missing(self, user_pk, names, batch_size):
+        """Create the names the user does not have yet"""
+        ids = self.user_ids(user_pk)
+        missing = [
+            self.model(user_id=user_pk, name=name)
+            for name in dict.fromkeys(names) if name not in ids
+        ]
+        for obj in bulk_create(self.model, missing, batch_size):
+            ids[obj.name] = obj.pk
+
+
+class Command(BaseCommand):
+    """Django command to bulk import recipes from CSV or NDJSON"""
+    help = 'Import recipes, creating their tags and ingredients by name'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='file to import, - for stdin')
+        parser.add_argument('--format', choices=sorted(READERS))
+        parser.add_argument(
+            '--user',
+            help='email of the owner of records without a user column'
+        )
+        parser.add_argument('--batch-size', type=int, default=10000)
+        parser.add_argument(
+            '--no-copy',
+            action='store_true',
+            help='use bulk_create even on PostgreSQL'
+        )
+
+    def handle(self, *args, **options):
+        path = options['path']
+        input_format = options['format'] or \
+            os.path.splitext(path)[1].lstrip('.').lower()
+        if input_format not in READERS:
+            raise CommandError(
+                'Cannot guess the input format, use --format.'
+            )
+
+        self.batch_size = options['batch_size']
+        self.use_copy = connection.vendor == 'postgresql' and \
+            not options['no_copy']
+        self.users = {}
+        self.default_user = options['user']
+        self.names = {
+            field: NameMap(model) for field, model in RELATED_MODELS.items()
+        }
+
+        if path == '-':
+            total = self.load(READERS[input_format](sys.stdin))
+        else:
+            with open(path, newline='', encoding='utf-8') as stream:
+                total = self.load(READERS[input_format](stream))
+
+        for user_pk in self.users.values():
+            invalidate_responses(user_pk)
+        self.stdout.write(self.style.SUCCESS(f'imported {total} recipes'))
+
+    def load(self, records):
+        """Import records batch by batch and return the number imported"""
+        records = enumerate(records, start=1)
+        total = 0
+        start = time.perf_counter()
+        while True:
+            batch = [
+                self.clean_record(number, record)
+                for number, record in islice(records, self.batch_size)
+            ]
+            if not batch:
+                return total
+
+            with transaction.atomic():
+                self.insert(batch)
+                pks = [recipe.pk for recipe, _ in batch]
+                # the tag and ingredient ETags depend on their recipes
+                touch_linked(Recipe, pks)
+                refresh_search(Recipe, pks)
+            total += len(batch)
+            elapsed = time.perf_counter() - start
+            self.stdout.write(
+                f'imported {total} recipes ({total / elapsed:.0f}/s)'
+            )
+
+    def get_user_pk(self, email, number):
+        """Return the primary key of the user with email"""
+        if not email:
+            raise CommandError(f'record {number}: no user, use --user.')
+        if email not in self.users:
+            pk = get_user_model().objects.filter(
+                email=email
+            ).values_list('pk', flat=True).first()
+            if pk is None:
+                raise CommandError(
+                    f'record {number}: unknown user {email}.'
+                )
+            self.users[email] = pk
+
+        return self.users[email]
+
+    def clean_record(self, number, record):
+        """Validate a record and return the recipe and names it holds"""
+        if not isinstance(record, dict):
+            raise CommandError(f'record {number}: expected an object.')
+
+        user_pk = self.get_user_pk(
+            record.get('user') or self.default_user,
+            number
+        )
+        try:
+            recipe = Recipe(user_id=user_pk, **{
+                name: Recipe._meta.get_field(name).clean(
+                    record.get(name, ''),
+                    None
+                )
+                for name in RECIPE_FIELDS
+            })
+            related = {
+                field: name_map.clean(record.get(field))
+                for field, name_map in self.names.items()
+            }
+        except ValidationError as error:
+            raise CommandError(
+                f'record {number}: {"; ".join(error.messages)}'
+            )
+
+        return recipe, related
+
+    def insert(self, batch):
+        """Insert a batch of recipes and link them to their names"""
+        for field, name_map in self.names.items():
+            names = {}
+            for recipe, related in batch:
+                names.setdefault(recipe.user_id, []).extend(related[field])
+            for user_pk, user_names in names.items():
+                name_map.create_missing(user_pk, user_names, self.batch_size)
+
+        recipes = [recipe for recipe, _ in batch]
+        if self.use_copy:
+            self.copy_recipes(recipes)
+        else:
+            bulk_create(Recipe, recipes, self.batch_size)
+
+        for field, name_map in self.names.items():
+            links = [
+                (recipe.pk, name_map.user_ids(recipe.user_id)[name])
+                for recipe, related in batch
+                for name in related[field]
+            ]
+            if self.use_copy:
+                self.copy_links(field, links)
+            else:
+                bulk_link(Recipe, field, links, self.batch_size)
+
+    def copy_recipes(self, recipes):
+        """COPY recipes into their table with ids reserved up front"""
+        table = Recipe._meta.db_table
+        fields = Recipe._meta.concrete_fields
+        with connection.cursor() as cursor:
+            cursor.execute(
+                'SELECT nextval(pg_get_serial_sequence(%s, %s)) '
+                'FROM generate_series(1, %s)',
+                [table, Recipe._meta.pk.column, len(recipes)]
+            )
+            for recipe, (pk,) in zip(recipes, cursor.fetchall()):
+                recipe.pk = pk
+
+            copy_rows(
+                cursor,
+                table,
+                [field.column for field in fields],
+                (
+                    [
+                        field.get_db_prep_save(
+                            field.pre_save(recipe, True),
+                            connection
+                        )
+                        for field in fields
+                    ]
+                    for recipe in recipes
+                )
+            )
+
+    def copy_links(self, field_name, links):
+        """COPY (recipe id, related id) pairs into a through table"""
+        field = Recipe._meta.get_field(field_name)
+        through = field.remote_field.through
+        with connection.cursor() as cursor:
+            copy_rows(
+                cursor,
+                through._meta.db_table,
+                [
+                    through._meta.get_field(field.m2m_field_name()).column,
+                    through._meta.get_field(
+                        field.m2m_reverse_field_name()
+                    ).column,
+                ],
+                links
+            )
@@ -0,0 +1,100 @@
+import http.client
+import threading
+import time
+from collections import Counter
+from urllib.parse import urlsplit
+
+from django.core.management.base import BaseCommand, CommandError
+
+from core.metrics import percentile
+
+
+class Command(BaseCommand):
+    """Django command to load test a running server over HTTP"""
+    help = 'Send concurrent GET requests to a URL and report latencies'
+
+    def add_arguments(self, parser):
+        parser.add_argument('url')
+        parser.add_argument('--requests', type=int, default=1000)
+        parser.add_argument('--concurrency', type=int, default=10)
+        parser.add_argument('--token', help='API token to authenticate with')
+        parser.add_argument('--timeout', type=float, default=30)
+
+    def handle(self, *args, **options):
+        url = urlsplit(options['url'])
+        if url.scheme not in ('http', 'https') or not url.hostname:
+            raise CommandError('Expected an http(s) URL.')
+        path = url.path or '/'
+        if url.query:
+            path += f'?{url.query}'
+        headers = {}
+        if options['token']:
+            headers['Authorization'] = f'Token {options["token"]}'
+        connection_class = http.client.HTTPSConnection \
+            if url.scheme == 'https' else http.client.HTTPConnection
+
+        remaining = [options['requests']]
+        lock = threading.Lock()
+        latencies = []
+        statuses = Counter()
+
+        def worker():
+            # one keep-alive connection per worker, like a browser would
+            connection = None
+            while True:
+                with lock:
+                    if remaining[0] <= 0:
+                        break
+                    remaining[0] -= 1
+                start = time.perf_counter()
+                try:
+                    if connection is None:
+                        connection = connection_class(
+                            url.hostname,
+                            url.port,
+                            timeout=options['timeout']
+                        )
+                    connection.request('GET', path, headers=headers)
+                    response = connection.getresponse()
+                    response.read()
+                    status = response.status
+                except (OSError, http.client.HTTPException) as error:
+                    status = type(error).__name__
+                    if connection is not None:
+                        connection.close()
+                    connection = None
+                elapsed = time.perf_counter() - start
+                with lock:
+                    latencies.append(elapsed)
+                    statuses[status] += 1
+            if connection is not None:
+                connection.close()
+
+        threads = [
+            threading.Thread(target=worker)
+            for _ in range(options['concurrency'])
+        ]
+        start = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - start
+
+        latencies.sort()
+        self.stdout.write(
+            f'{len(latencies)} requests in {elapsed:.2f}s '
+            f'({len(latencies) / elapsed:.0f} req/s, '
+            f'concurrency {options["concurrency"]})'
+        )
+        self.stdout.write(' '.join(
+            f'p{int(fraction * 100)} '
+            f'{percentile(latencies, fraction) * 1000:.1f}ms'
+            for fraction in (0.5, 0.95, 0.99)
+        ))
+        self.stdout.write('statuses: ' + ', '.join(
+            f'{status} x{count}' for status, count in sorted(
+                statuses.items(),
+                key=lambda item: str(item[0])
+            )
+        ))
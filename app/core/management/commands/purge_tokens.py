@@ -0,0 +1,48 @@
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.utils import timezone
+
+from rest_framework.authtoken.models import Token
+
+
+class Command(BaseCommand):
+    """Django command to delete the expired API tokens"""
+    help = 'Delete the tokens older than TOKEN_TTL, in small batches'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument(
+            '--sleep',
+            type=float,
+            default=0,
+            help='seconds to pause between batches'
+        )
+
+    def handle(self, *args, **options):
+        if not settings.TOKEN_TTL:
+            raise CommandError('Tokens never expire, TOKEN_TTL is 0.')
+
+        cutoff = timezone.now() - timedelta(seconds=settings.TOKEN_TTL)
+        expired = Token.objects.filter(created__lte=cutoff)
+        total = 0
+        while True:
+            # one short transaction per batch, using the created index
+            with transaction.atomic():
+                keys = list(expired.order_by('created').values_list(
+                    'key', flat=True
+                )[:options['batch_size']])
+                if not keys:
+                    break
+                Token.objects.filter(key__in=keys).delete()
+            total += len(keys)
+            self.stdout.write(f'deleted {total} tokens')
+            if options['sleep']:
+                time.sleep(options['sleep'])
+
+        self.stdout.write(self.style.SUCCESS(
+            f'purged {total} expired tokens'
+        ))
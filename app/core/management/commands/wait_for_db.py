@@ -1,23 +1,100 @@
+import random
 import time
+from concurrent.futures import ThreadPoolExecutor
 
 from django.db import connections
 from django.db.utils import OperationalError
-from django.core.management.base import BaseCommand
+from django.core.management.base import BaseCommand, CommandError
 
 
 class Command(BaseCommand):
     """Django command to pause execution until database is ready"""
 
-    def handle(self, *args, **options):
-        self.stdout.write('waiting for database...')
-        db_conn = None
-        while not db_conn:
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--database',
+            action='append',
+            dest='databases',
+            help='alias to wait for, can be repeated (default: default)'
+        )
+        parser.add_argument(
+            '--timeout',
+            type=float,
+            default=60,
+            help='seconds to wait before giving up with exit code 1'
+        )
+        parser.add_argument('--interval', type=float, default=0.5)
+        parser.add_argument('--max-interval', type=float, default=5)
+
+    def probe(self, alias):
+        """Open a connection to the database alias and run SELECT 1"""
+        connection = connections[alias]
+        try:
+            with connection.cursor() as cursor:
+                cursor.execute('SELECT 1')
+                cursor.fetchone()
+        finally:
+            connection.close()
+
+    def wait(self, alias, deadline, interval, max_interval):
+        """Probe alias with exponential backoff until it answers or deadline
+
+        Return whether the database became available.
+        """
+        attempt = 0
+        while True:
             try:
-                db_conn = connections["default"]
-            except OperationalError:
+                self.probe(alias)
+                return True
+            except OperationalError as error:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    self.stderr.write(f'{alias}: {error}')
+                    return False
+                # full jitter keeps restarting replicas from probing in step
+                delay = min(max_interval, interval * 2 ** attempt)
+                delay = min(random.uniform(delay / 2, delay), remaining)
                 self.stdout.write(self.style.WARNING(
-                    'Database unvailable, wait 1 second...'
-                    ))
-                time.sleep(1)
+                    f'Database {alias} unavailable, '
+                    f'waiting {delay:.2f} seconds...'
+                ))
+                time.sleep(delay)
+                attempt += 1
+
+    def handle(self, *args, **options):
+        aliases = options['databases'] or ['default']
+        unknown = [
+            alias for alias in aliases if alias not in connections.databases
+        ]
+        if unknown:
+            raise CommandError(
+                f'Unknown database alias: {", ".join(unknown)}'
+            )
+
+        self.stdout.write('waiting for database...')
+        deadline = time.monotonic() + options['timeout']
+
+        def wait(alias):
+            return self.wait(
+                alias,
+                deadline,
+                options['interval'],
+                options['max_interval']
+            )
+
+        if len(aliases) == 1:
+            results = [wait(aliases[0])]
+        else:
+            with ThreadPoolExecutor(max_workers=len(aliases)) as executor:
+                results = list(executor.map(wait, aliases))
+
+        unavailable = [
+            alias for alias, ready in zip(aliases, results) if not ready
+        ]
+        if unavailable:
+            raise CommandError(
+                f'Database unavailable after {options["timeout"]:g} '
+                f'seconds: {", ".join(unavailable)}'
+            )
 
         self.stdout.write(self.style.SUCCESS('DataBase availabe!'))
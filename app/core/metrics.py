@@ -0,0 +1,146 @@
+import contextvars
+import logging
+import threading
+import time
+from collections import Counter, defaultdict, deque
+from contextlib import contextmanager
+
+from django.conf import settings
+
+
+logger = logging.getLogger(__name__)
+
+TIMINGS = ('sql', 'serialize', 'render', 'total')
+
+current = contextvars.ContextVar('request_metrics', default=None)
+
+
+def percentile(values, fraction):
+    """Return the value below which fraction of the sorted values fall"""
+    if not values:
+        return 0
+
+    return values[min(len(values) - 1, int(len(values) * fraction))]
+
+
+class RequestMetrics:
+    """Queries and timings of one request"""
+
+    def __init__(self, track_duplicates=False):
+        self.queries = 0
+        self.timings = dict.fromkeys(TIMINGS, 0.0)
+        self.statements = Counter() if track_duplicates else None
+
+    def execute(self, execute, sql, params, many, context):
+        """Database execute_wrapper counting and timing every query"""
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.timings['sql'] += time.perf_counter() - start
+            self.queries += 1
+            if self.statements is not None:
+                self.statements[sql] += 1
+
+    def duplicates(self, threshold):
+        """Return the statements run at least threshold times"""
+        if self.statements is None:
+            return {}
+
+        return {
+            sql: count for sql, count in self.statements.items()
+            if count >= threshold
+        }
+
+    def server_timing(self):
+        """Return the value of the Server-Timing header"""
+        return ', '.join(
+            f'{name};dur={self.timings[name] * 1000:.2f}'
+            + (f';desc="{self.queries} queries"' if name == 'sql' else '')
+            for name in TIMINGS
+        )
+
+
+@contextmanager
+def timed(name):
+    """Add the time spent in the block to timing name of the request"""
+    metrics = current.get()
+    if metrics is None:
+        yield
+        return
+
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        metrics.timings[name] += time.perf_counter() - start
+
+
+class MetricsStore:
+    """Recent samples of the request metrics of each view, per process"""
+
+    def __init__(self, samples=1000):
+        self.samples = samples
+        self.lock = threading.Lock()
+        self.views = defaultdict(self._new_view)
+
+    def _new_view(self):
+        return {
+            'count': 0,
+            'duplicates': 0,
+            'queries': deque(maxlen=self.samples),
+            **{name: deque(maxlen=self.samples) for name in TIMINGS},
+        }
+
+    def record(self, view_name, metrics, duplicates=0):
+        """Add the metrics of a request to view_name"""
+        with self.lock:
+            view = self.views[view_name]
+            view['count'] += 1
+            view['duplicates'] += duplicates
+            view['queries'].append(metrics.queries)
+            for name in TIMINGS:
+                view[name].append(metrics.timings[name] * 1000)
+
+    def clear(self):
+        with self.lock:
+            self.views.clear()
+
+    def report(self):
+        """Return count and p50/p95/p99 of every metric of every view"""
+        with self.lock:
+            views = {
+                name: {key: (
+                    value if isinstance(value, int) else sorted(value)
+                ) for key, value in view.items()}
+                for name, view in self.views.items()
+            }
+
+        return {
+            name: {
+                'count': view['count'],
+                'duplicate_queries': view['duplicates'],
+                **{
+                    key: {
+                        f'p{int(fraction * 100)}': round(
+                            percentile(view[key], fraction), 3
+                        )
+                        for fraction in (0.5, 0.95, 0.99)
+                    }
+                    for key in ('queries',) + TIMINGS
+                },
+            }
+            for name, view in sorted(views.items())
+        }
+
+
+store = MetricsStore(settings.METRICS['SAMPLES'])
+
+
+class TimedSerializerMixin:
+    """Count the time spent building serializer data as serialize time"""
+
+    @property
+    def data(self):
+        with timed('serialize'):
+            return super().data
@@ -0,0 +1,66 @@
+import time
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+
+from core.metrics import RequestMetrics, current, logger, store
+
+
+class MetricsMiddleware:
+    """Record the queries and timings of every request per resolved view
+
+    Timings are sent back in a Server-Timing header and kept in
+    core.metrics.store for the metrics endpoint. With DUPLICATE_QUERIES
+    statements run DUPLICATE_THRESHOLD times or more in one request are
+    logged as likely N+1 queries.
+    """
+
+    def __init__(self, get_response):
+        if not settings.METRICS['ENABLED']:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        config = settings.METRICS
+        metrics = RequestMetrics(config['DUPLICATE_QUERIES'])
+        token = current.set(metrics)
+        start = time.perf_counter()
+        try:
+            with ExitStack() as stack:
+                for connection in connections.all():
+                    stack.enter_context(
+                        connection.execute_wrapper(metrics.execute)
+                    )
+                response = self.get_response(request)
+        finally:
+            current.reset(token)
+        metrics.timings['total'] = time.perf_counter() - start
+
+        duplicates = metrics.duplicates(config['DUPLICATE_THRESHOLD'])
+        match = request.resolver_match
+        view_name = match.view_name if match else None
+        for sql, count in duplicates.items():
+            logger.warning(
+                'Query run %d times by %s: %s', count, view_name, sql
+            )
+        if view_name:
+            store.record(view_name, metrics, len(duplicates))
+        if config['SERVER_TIMING']:
+            response['Server-Timing'] = metrics.server_timing()
+
+        return response
+
+    def process_template_response(self, request, response):
+        """Time the rendering of the response about to happen"""
+        metrics = current.get()
+        if metrics is not None:
+            start = time.perf_counter()
+
+            def rendered(response):
+                metrics.timings['render'] += time.perf_counter() - start
+
+            response.add_post_render_callback(rendered)
+
+        return response
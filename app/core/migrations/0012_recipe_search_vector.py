@@ -0,0 +1,53 @@
+# Generated by Django 3.0.14 on 2026-10-18 05:56
+
+import django.contrib.postgres.search
+from django.db import migrations
+
+
+NAMES_SQL = (
+    "coalesce((SELECT string_agg(t.name, ' ') FROM core_{model} t "
+    "JOIN core_recipe_{table} l ON l.{model}_id = t.id "
+    "WHERE l.recipe_id = core_recipe.id), '')"
+)
+
+BACKFILL_SQL = (
+    "UPDATE core_recipe SET search_vector = "
+    "setweight(to_tsvector('english', title), 'A') || "
+    "setweight(to_tsvector('english', "
+    + NAMES_SQL.format(model='tag', table='tags') + "), 'B') || "
+    "setweight(to_tsvector('english', "
+    + NAMES_SQL.format(model='ingredient', table='ingredients') + "), 'C')"
+)
+
+
+def create_search_index(apps, schema_editor):
+    """Backfill the search vectors and index them, on PostgreSQL only"""
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute(BACKFILL_SQL)
+    schema_editor.execute(
+        'CREATE INDEX core_recipe_search_vector_idx '
+        'ON core_recipe USING gin (search_vector)'
+    )
+
+
+def drop_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute('DROP INDEX core_recipe_search_vector_idx')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0011_modified'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='recipe',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True),
+        ),
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
@@ -0,0 +1,34 @@
+from django.db import migrations
+
+
+def create_created_index(apps, schema_editor):
+    """Index the tokens by creation time, without blocking writes"""
+    concurrently = 'CONCURRENTLY ' \
+        if schema_editor.connection.vendor == 'postgresql' else ''
+    schema_editor.execute(
+        f'CREATE INDEX {concurrently}authtoken_token_created_idx '
+        'ON authtoken_token (created)'
+    )
+
+
+def drop_created_index(apps, schema_editor):
+    concurrently = 'CONCURRENTLY ' \
+        if schema_editor.connection.vendor == 'postgresql' else ''
+    schema_editor.execute(
+        f'DROP INDEX {concurrently}authtoken_token_created_idx'
+    )
+
+
+class Migration(migrations.Migration):
+    # CREATE INDEX CONCURRENTLY cannot run inside a transaction
+    atomic = False
+
+    dependencies = [
+        ('core', '0012_recipe_search_vector'),
+        ('authtoken', '0002_auto_20160226_1747'),
+    ]
+
+    operations = [
+        # expired tokens are looked up and purged by creation time
+        migrations.RunPython(create_created_index, drop_created_index),
+    ]
@@ -0,0 +1,141 @@
+from django.conf import settings
+from django.core.signals import request_started
+from django.db import connections, transaction
+from django.db.models.signals import m2m_changed, post_delete, post_save, \
+    pre_delete
+from django.dispatch import receiver
+from django.utils import timezone
+
+from rest_framework.authtoken.models import Token
+
+from core.authentication import invalidate_token
+from core.cache import response_cache
+from core.models import Tag, Ingredient, Recipe
+
+
+RECIPE_FIELDS = {
+    Tag: 'tags',
+    Ingredient: 'ingredients',
+    Recipe.tags.through: 'tags',
+    Recipe.ingredients.through: 'ingredients',
+}
+
+
+def invalidate_responses(user_pk):
+    """Invalidate the cached responses of a user
+
+    Invalidating again on commit keeps responses rendered by concurrent
+    requests from the not yet committed state out of the cache.
+    """
+    response_cache.invalidate(user_pk)
+    transaction.on_commit(lambda: response_cache.invalidate(user_pk))
+
+
+def touch(queryset):
+    """Bump the modification time of every object in queryset"""
+    queryset.update(modified=timezone.now())
+
+
+@receiver(request_started)
+def check_connections(**kwargs):
+    """Drop persistent connections that stopped working between requests
+
+    Only for the databases with CONN_HEALTH_CHECKS enabled, so a dead
+    connection is replaced before the request's first query fails.
+    """
+    for conn in connections.all():
+        if conn.settings_dict.get('CONN_HEALTH_CHECKS') and \
+                conn.connection is not None and \
+                not conn.in_atomic_block and not conn.is_usable():
+            conn.close()
+
+
+@receiver(post_delete, sender=Token)
+def invalidate_deleted_token(sender, instance, **kwargs):
+    """Remove a deleted token from the authentication cache"""
+    invalidate_token(instance.key)
+
+
+@receiver(post_save, sender=settings.AUTH_USER_MODEL)
+def invalidate_user_tokens(sender, instance, created, **kwargs):
+    """Remove the tokens of a changed user from the authentication cache"""
+    if created:
+        return
+    for key in Token.objects.filter(user=instance).values_list(
+        'key', flat=True
+    ):
+        invalidate_token(key)
+
+
+@receiver(m2m_changed, sender=Recipe.tags.through)
+@receiver(m2m_changed, sender=Recipe.ingredients.through)
+def touch_linked_objects(sender, instance, action, reverse, model, pk_set,
+                         **kwargs):
+    """Mark both sides of added or removed recipe links as modified"""
+    if action not in ('post_add', 'post_remove', 'pre_clear'):
+        return
+
+    field = RECIPE_FIELDS[sender]
+    if reverse:
+        if pk_set is None:
+            recipes = Recipe.objects.filter(**{field: instance})
+        else:
+            recipes = Recipe.objects.filter(pk__in=pk_set)
+        related = type(instance).objects.filter(pk=instance.pk)
+    else:
+        recipes = Recipe.objects.filter(pk=instance.pk)
+        if pk_set is None:
+            related = model.objects.filter(recipe=instance)
+        else:
+            related = model.objects.filter(pk__in=pk_set)
+
+    touch(recipes)
+    touch(related)
+
+
+@receiver(post_save, sender=Tag)
+@receiver(post_save, sender=Ingredient)
+def touch_recipes_of_renamed(sender, instance, created, **kwargs):
+    """Mark the recipes nesting a changed tag or ingredient as modified"""
+    if not created:
+        touch(Recipe.objects.filter(**{RECIPE_FIELDS[sender]: instance}))
+
+
+@receiver(pre_delete, sender=Tag)
+@receiver(pre_delete, sender=Ingredient)
+def touch_recipes_of_deleted(sender, instance, **kwargs):
+    """Mark the recipes losing a deleted tag or ingredient as modified"""
+    touch(Recipe.objects.filter(**{RECIPE_FIELDS[sender]: instance}))
+
+
+@receiver(pre_delete, sender=Recipe)
+def touch_objects_of_deleted_recipe(sender, instance, **kwargs):
+    """Mark the tags and ingredients losing a deleted recipe as modified"""
+    touch(Tag.objects.filter(recipe=instance))
+    touch(Ingredient.objects.filter(recipe=instance))
+
+
+@receiver(post_save, sender=settings.AUTH_USER_MODEL)
+def start_response_generation(sender, instance, created, **kwargs):
+    """Make sure a new user never sees responses cached under its id"""
+    if created:
+        response_cache.invalidate(instance.pk)
+
+
+@receiver(post_save, sender=Tag)
+@receiver(post_save, sender=Ingredient)
+@receiver(post_save, sender=Recipe)
+@receiver(post_delete, sender=Tag)
+@receiver(post_delete, sender=Ingredient)
+@receiver(post_delete, sender=Recipe)
+def invalidate_owner_responses(sender, instance, **kwargs):
+    """Invalidate the cached responses of the owner of a changed object"""
+    invalidate_responses(instance.user_id)
+
+
+@receiver(m2m_changed, sender=Recipe.tags.through)
+@receiver(m2m_changed, sender=Recipe.ingredients.through)
+def invalidate_linked_responses(sender, instance, action, **kwargs):
+    """Invalidate the cached responses of the owner of changed links"""
+    if action in ('post_add', 'post_remove', 'post_clear'):
+        invalidate_responses(instance.user_id)
@@ -0,0 +1,51 @@
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.db import connections, transaction
+
+
+logger = logging.getLogger(__name__)
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def get_executor():
+    """Return the process wide pool running background tasks"""
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=settings.TASK_WORKERS,
+                thread_name_prefix='tasks'
+            )
+
+    return _executor
+
+
+def _run(func, *args):
+    """Run a task, logging failures and releasing its DB connections"""
+    try:
+        func(*args)
+    except Exception:
+        logger.exception('Background task %s failed', func.__name__)
+    finally:
+        connections.close_all()
+
+
+def enqueue(func, *args):
+    """Run func(*args) in the background once the transaction commits
+
+    With TASKS_ALWAYS_EAGER the task runs immediately in the caller,
+    which keeps tests deterministic. Tasks live in the memory of the
+    process: those still queued when it exits, for instance when
+    gunicorn recycles a worker after max_requests, are lost and need a
+    sweep such as the process_images command.
+    """
+    if settings.TASKS_ALWAYS_EAGER:
+        func(*args)
+        return
+
+    transaction.on_commit(lambda: get_executor().submit(_run, func, *args))
@@ -0,0 +1,74 @@
+import asyncio
+import threading
+
+from django.http import StreamingHttpResponse
+from django.test import SimpleTestCase
+
+from core.asgi import ThreadPoolASGIHandler
+
+
+def scope(path):
+    """Return the ASGI scope of a GET request to path"""
+    return {
+        'type': 'http',
+        'method': 'GET',
+        'path': path,
+        'query_string': b'',
+        'headers': [(b'host', b'testserver')],
+    }
+
+
+class ThreadPoolASGIHandlerTests(SimpleTestCase):
+
+    def setUp(self):
+        self.handler = ThreadPoolASGIHandler(threads=2, max_pending=1)
+        self.addCleanup(self.handler.executor.shutdown)
+
+    def call(self, coroutine_function, *args):
+        """Run a handler coroutine and return the messages it sent"""
+        messages = []
+
+        async def receive():
+            return {'type': 'http.request'}
+
+        async def send(message):
+            messages.append(message)
+
+        asyncio.run(coroutine_function(*args, receive, send))
+        return messages
+
+    def test_request_handled(self):
+        """Test requests are answered by the synchronous views"""
+        messages = self.call(self.handler, scope('/api/recipe/tags/'))
+
+        self.assertEqual(messages[0]['status'], 401)
+
+    def test_overloaded_requests_rejected(self):
+        """Test requests beyond the pending limit get a 503"""
+        self.handler.in_flight = 3
+
+        messages = self.call(self.handler, scope('/api/recipe/tags/'))
+
+        self.assertEqual(messages[0]['status'], 503)
+
+    def test_streaming_iterated_on_worker_thread(self):
+        """Test streaming responses are produced off the event loop"""
+        threads = []
+
+        def content():
+            for part in (b'a', b'b', b'c'):
+                threads.append(threading.current_thread().name)
+                yield part
+
+        response = StreamingHttpResponse(content())
+
+        async def send_response(receive, send):
+            await self.handler.send_response(response, send)
+
+        messages = self.call(send_response)
+
+        self.assertEqual(
+            b''.join(message.get('body', b'') for message in messages[1:]),
+            b'abc'
+        )
+        self.assertTrue(all(name.startswith('asgi') for name in threads))
@@ -0,0 +1,117 @@
+from datetime import timedelta
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from rest_framework.authtoken.models import Token
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework.test import APIRequestFactory
+
+from core.authentication import CachedTokenAuthentication, \
+                                local_token_cache, shared_token_cache, \
+                                issue_token, token_cache_key
+
+
+class CachedTokenAuthenticationTests(TestCase):
+
+    def setUp(self):
+        local_token_cache.clear()
+        shared_token_cache().clear()
+        self.user = get_user_model().objects.create_user(
+            'test@test.com',
+            'testtest'
+        )
+        self.token = Token.objects.create(user=self.user)
+        self.auth = CachedTokenAuthentication()
+
+    def authenticate(self, key):
+        """Authenticate a request carrying the given token key"""
+        request = APIRequestFactory().get(
+            '/', HTTP_AUTHORIZATION=f'Token {key}'
+        )
+        return self.auth.authenticate(request)
+
+    def test_token_cached_after_first_lookup(self):
+        """Test only the first authentication queries the database"""
+        with self.assertNumQueries(1):
+            user, token = self.authenticate(self.token.key)
+        with self.assertNumQueries(0):
+            user, token = self.authenticate(self.token.key)
+
+        self.assertEqual(user, self.user)
+        self.assertEqual(token.key, self.token.key)
+
+    def test_shared_cache_used_when_local_cache_empty(self):
+        """Test the shared cache is used by other processes"""
+        self.authenticate(self.token.key)
+        local_token_cache.clear()
+
+        with self.assertNumQueries(0):
+            user, token = self.authenticate(self.token.key)
+
+        self.assertEqual(user, self.user)
+
+    def test_password_hash_not_cached(self):
+        """Test the cached user has no password, loaded when needed"""
+        self.authenticate(self.token.key)
+        entry = shared_token_cache().get(token_cache_key(self.token.key))
+        self.assertNotIn(self.user.password, repr(entry))
+
+        user, token = self.authenticate(self.token.key)
+        user.name = 'new name'
+        user.save()
+
+        self.user.refresh_from_db()
+        self.assertEqual(self.user.name, 'new name')
+        self.assertTrue(self.user.check_password('testtest'))
+        with self.assertNumQueries(1):
+            self.assertTrue(user.check_password('testtest'))
+
+    def test_deleted_token_invalidated(self):
+        """Test a deleted token no longer authenticates"""
+        key = self.token.key
+        self.authenticate(key)
+        self.token.delete()
+
+        with self.assertRaises(AuthenticationFailed):
+            self.authenticate(key)
+
+    def test_inactive_user_invalidated(self):
+        """Test deactivating a user invalidates their cached token"""
+        self.authenticate(self.token.key)
+        self.user.is_active = False
+        self.user.save()
+
+        with self.assertRaises(AuthenticationFailed):
+            self.authenticate(self.token.key)
+
+    @override_settings(TOKEN_TTL=60)
+    def test_expired_token_rejected_without_query(self):
+        """Test a cached token past its lifetime no longer authenticates"""
+        self.authenticate(self.token.key)
+        later = timezone.now() + timedelta(seconds=61)
+
+        with patch('core.authentication.timezone.now', return_value=later):
+            with self.assertNumQueries(0):
+                with self.assertRaises(AuthenticationFailed):
+                    self.authenticate(self.token.key)
+
+    @override_settings(TOKEN_TTL=60)
+    def test_token_cached_until_expiry(self):
+        """Test tokens are not cached beyond their lifetime"""
+        self.assertEqual(self.auth.cache_timeout(self.token), 59)
+
+    @override_settings(TOKEN_TTL=60)
+    def test_issue_token_replaces_expired(self):
+        """Test a new token is issued once the current one expired"""
+        self.assertEqual(issue_token(self.user), self.token)
+        Token.objects.filter(pk=self.token.pk).update(
+            created=timezone.now() - timedelta(seconds=61)
+        )
+
+        token = issue_token(self.user)
+
+        self.assertNotEqual(token.key, self.token.key)
+        self.assertFalse(Token.objects.filter(pk=self.token.pk).exists())
@@ -0,0 +1,56 @@
+from unittest.mock import patch
+
+from django.test import TestCase
+
+from core.cache import LRUCache, ResponseCache
+
+
+class LRUCacheTests(TestCase):
+
+    def test_least_recently_used_evicted(self):
+        """Test the least recently used entry is evicted when full"""
+        cache = LRUCache(max_entries=2)
+        cache.set('a', 1)
+        cache.set('b', 2)
+        cache.get('a')
+        cache.set('c', 3)
+
+        self.assertEqual(cache.get('a'), 1)
+        self.assertIsNone(cache.get('b'))
+        self.assertEqual(cache.get('c'), 3)
+
+    @patch('time.monotonic')
+    def test_entries_expire(self, monotonic):
+        """Test entries are not returned after their timeout"""
+        monotonic.return_value = 100
+        cache = LRUCache(timeout=10)
+        cache.set('a', 1)
+
+        monotonic.return_value = 111
+        self.assertIsNone(cache.get('a'))
+        self.assertEqual(len(cache), 0)
+
+
+class ResponseCacheTests(TestCase):
+
+    def setUp(self):
+        self.cache = ResponseCache({
+            'BACKEND': 'local',
+            'CACHE_ALIAS': 'default',
+            'TIMEOUT': 60,
+            'MAX_ENTRIES': 10,
+        })
+
+    def test_invalidate_drops_user_responses(self):
+        """Test invalidating a user changes the keys of their responses"""
+        key = self.cache.make_key(1, 'recipe:recipe-list')
+        self.cache.set(key, b'cached')
+        other_key = self.cache.make_key(2, 'recipe:recipe-list')
+
+        self.cache.invalidate(1)
+
+        self.assertNotEqual(self.cache.make_key(1, 'recipe:recipe-list'), key)
+        self.assertEqual(
+            self.cache.make_key(2, 'recipe:recipe-list'),
+            other_key
+        )
@@ -1,23 +1,242 @@
+import tempfile
+import threading
+from datetime import timedelta
+from decimal import Decimal
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from io import StringIO
 from unittest.mock import patch
 
+from django.contrib.auth import get_user_model
 from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db import connections
 from django.db.utils import OperationalError
-from django.test import TestCase
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from rest_framework.authtoken.models import Token
+
+from core.management.commands.import_recipes import copy_escape
+from core.models import Tag, Ingredient, Recipe
 
 
 class CommandTests(TestCase):
 
-    def test_wait_for_db_ready(self):
+    @patch('core.management.commands.wait_for_db.Command.probe')
+    def test_wait_for_db_ready(self, probe):
         """test waiting for db when db is available"""
-        with patch('django.db.utils.ConnectionHandler.__getitem__') as gi:
-            gi.return_value = True
-            call_command('wait_for_db')
-            self.assertEqual(gi.call_count, 1)
+        call_command('wait_for_db', stdout=StringIO())
+
+        probe.assert_called_once_with('default')
 
     @patch('time.sleep', return_value=True)
-    def test_wait_for_db(self, ts):
+    @patch('core.management.commands.wait_for_db.Command.probe')
+    def test_wait_for_db(self, probe, ts):
         """Test waiting for db"""
-        with patch('django.db.utils.ConnectionHandler.__getitem__') as gi:
-            gi.side_effect = [OperationalError] * 5 + [True]
-            call_command("wait_for_db")
-            self.assertEqual(gi.call_count, 6)
+        probe.side_effect = [OperationalError] * 5 + [None]
+
+        call_command('wait_for_db', stdout=StringIO())
+
+        self.assertEqual(probe.call_count, 6)
+        delays = [call[0][0] for call in ts.call_args_list]
+        self.assertTrue(all(0 < delay <= 5 for delay in delays))
+        self.assertLess(delays[0], delays[-1])
+
+    @patch('core.management.commands.wait_for_db.Command.probe')
+    def test_wait_for_db_timeout(self, probe):
+        """Test giving up with an error once the deadline has passed"""
+        probe.side_effect = OperationalError('connection refused')
+
+        with self.assertRaisesMessage(CommandError, 'default'):
+            call_command(
+                'wait_for_db', '--timeout', '0',
+                stdout=StringIO(), stderr=StringIO()
+            )
+
+    @patch('core.management.commands.wait_for_db.Command.probe')
+    def test_wait_for_several_databases(self, probe):
+        """Test every database alias given is probed"""
+        with patch.dict(connections.databases, {'other': {}}):
+            call_command(
+                'wait_for_db', '--database', 'default', '--database', 'other',
+                stdout=StringIO()
+            )
+
+        self.assertEqual(
+            sorted(call[0][0] for call in probe.call_args_list),
+            ['default', 'other']
+        )
+
+    @patch('core.management.commands.wait_for_db.Command.probe')
+    def test_wait_for_unknown_database(self, probe):
+        """Test an unconfigured alias fails without probing anything"""
+        with self.assertRaisesMessage(CommandError, 'nope'):
+            call_command(
+                'wait_for_db', '--database', 'default', '--database', 'nope',
+                stdout=StringIO()
+            )
+
+        probe.assert_not_called()
+
+
+@override_settings(TOKEN_TTL=60)
+class PurgeTokensTests(TestCase):
+
+    def test_purge_expired_tokens(self):
+        """Test expired tokens are deleted in batches, fresh ones kept"""
+        users = [
+            get_user_model().objects.create_user(f'user{n}@test.com')
+            for n in range(4)
+        ]
+        tokens = [Token.objects.create(user=user) for user in users]
+        Token.objects.filter(pk__in=[t.pk for t in tokens[:3]]).update(
+            created=timezone.now() - timedelta(seconds=61)
+        )
+        out = StringIO()
+
+        call_command('purge_tokens', '--batch-size', '2', stdout=out)
+
+        self.assertEqual(
+            list(Token.objects.values_list('key', flat=True)),
+            [tokens[3].key]
+        )
+        self.assertIn('deleted 2 tokens', out.getvalue())
+        self.assertIn('purged 3 expired tokens', out.getvalue())
+
+    @override_settings(TOKEN_TTL=0)
+    def test_purge_tokens_without_expiry(self):
+        """Test purging fails when tokens never expire"""
+        with self.assertRaises(CommandError):
+            call_command('purge_tokens', stdout=StringIO())
+
+
+class ImportRecipesTests(TestCase):
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            'test@test.com',
+            'testpass'
+        )
+        self.tag = Tag.objects.create(user=self.user, name='Vegan')
+
+    def import_file(self, content, suffix, *args):
+        """Write content to a temporary file and import it"""
+        with tempfile.NamedTemporaryFile('w', suffix=suffix) as ntf:
+            ntf.write(content)
+            ntf.flush()
+            out = StringIO()
+            call_command(
+                'import_recipes', ntf.name, '--user', self.user.email,
+                *args, stdout=out
+            )
+
+        return out.getvalue()
+
+    def test_import_csv(self):
+        """Test importing CSV reuses existing names and creates others"""
+        output = self.import_file(
+            'title,time_minutes,price,tags,ingredients\n'
+            'Salad,5,3.50,Vegan;Quick,Lettuce;Tomato\n'
+            'Soup,30,4.00,Vegan,Tomato;Tomato\n',
+            '.csv',
+            '--batch-size', '1'
+        )
+
+        self.assertIn('imported 2 recipes', output)
+        salad = Recipe.objects.get(title='Salad')
+        soup = Recipe.objects.get(title='Soup')
+        self.assertEqual(salad.user, self.user)
+        self.assertEqual(salad.price, Decimal('3.50'))
+        self.assertEqual(Tag.objects.filter(user=self.user).count(), 2)
+        self.assertEqual(
+            sorted(salad.tags.values_list('name', flat=True)),
+            ['Quick', 'Vegan']
+        )
+        self.assertIn(self.tag, soup.tags.all())
+        self.assertEqual(
+            list(soup.ingredients.values_list('name', flat=True)),
+            ['Tomato']
+        )
+        self.assertEqual(Ingredient.objects.count(), 2)
+
+    def test_import_touches_existing_names(self):
+        """Test linking existing tags bumps their modification time"""
+        modified = self.tag.modified
+
+        self.import_file(
+            'title,time_minutes,price,tags,ingredients\n'
+            'Salad,5,3.50,Vegan,Lettuce\n',
+            '.csv'
+        )
+
+        self.tag.refresh_from_db()
+        self.assertGreater(self.tag.modified, modified)
+
+    def test_import_ndjson(self):
+        """Test importing NDJSON records"""
+        self.import_file(
+            '{"title": "Pasta", "time_minutes": 12, "price": 6.5, '
+            '"tags": ["Quick"], "ingredients": []}\n\n',
+            '.ndjson'
+        )
+
+        recipe = Recipe.objects.get(title='Pasta')
+        self.assertEqual(recipe.time_minutes, 12)
+        self.assertEqual(
+            list(recipe.tags.values_list('name', flat=True)),
+            ['Quick']
+        )
+
+    def test_import_invalid_record(self):
+        """Test an invalid record aborts the import with its number"""
+        with self.assertRaisesMessage(CommandError, 'record 2:'):
+            self.import_file(
+                'title,time_minutes,price\n'
+                'Salad,5,3.50\n'
+                'Soup,soon,4.00\n',
+                '.csv'
+            )
+
+        self.assertFalse(Recipe.objects.exists())
+
+    def test_copy_escape(self):
+        """Test values are escaped for the COPY text format"""
+        self.assertEqual(copy_escape(None), '\\N')
+        self.assertEqual(copy_escape('a\tb\nc\\'), 'a\\tb\\nc\\\\')
+
+
+class LoadTestHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def do_GET(self):
+        status = 200 if self.headers['Authorization'] == 'Token abc' else 401
+        self.send_response(status)
+        self.send_header('Content-Length', '2')
+        self.end_headers()
+        self.wfile.write(b'{}')
+
+    def log_message(self, *args):
+        pass
+
+
+class LoadTestTests(TestCase):
+
+    def setUp(self):
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), LoadTestHandler)
+        self.server.daemon_threads = True
+        threading.Thread(target=self.server.serve_forever).start()
+        self.addCleanup(self.server.server_close)
+        self.addCleanup(self.server.shutdown)
+
+    def test_loadtest_reports_latencies(self):
+        """Test the load test sends every request and reports them"""
+        out = StringIO()
+        call_command(
+            'loadtest', f'http://127.0.0.1:{self.server.server_port}/x/',
+            '--requests', '20', '--concurrency', '4', '--token', 'abc',
+            stdout=out
+        )
+
+        self.assertIn('20 requests in', out.getvalue())
+        self.assertIn('p95', out.getvalue())
+        self.assertIn('statuses: 200 x20', out.getvalue())
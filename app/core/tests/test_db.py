@@ -0,0 +1,105 @@
+import threading
+from unittest.mock import MagicMock, patch
+
+from django.db.utils import OperationalError
+from django.test import SimpleTestCase
+
+from core.db.pool import ConnectionPool, get_pool
+from core.signals import check_connections
+
+
+class ConnectionPoolTests(SimpleTestCase):
+
+    def make_pool(self, **kwargs):
+        """Return a pool of mock connections"""
+        return ConnectionPool(
+            connect=MagicMock(side_effect=lambda: MagicMock()),
+            check=MagicMock(),
+            reset=MagicMock(),
+            **kwargs
+        )
+
+    def test_connections_reused(self):
+        """Test a connection given back is handed out again"""
+        pool = self.make_pool()
+        connection = pool.get()
+        pool.put(connection)
+
+        self.assertIs(pool.get(), connection)
+        self.assertEqual(pool.connect.call_count, 1)
+        pool.check.assert_not_called()
+
+    def test_pool_bounded(self):
+        """Test getting a connection from a full pool times out"""
+        pool = self.make_pool(max_size=1, timeout=0.01)
+        pool.get()
+
+        with self.assertRaises(OperationalError):
+            pool.get()
+
+    def test_waits_for_free_connection(self):
+        """Test a full pool hands out the next connection given back"""
+        pool = self.make_pool(max_size=1, timeout=5)
+        connection = pool.get()
+        threading.Timer(0.05, pool.put, [connection]).start()
+
+        self.assertIs(pool.get(), connection)
+
+    def test_stale_connection_discarded(self):
+        """Test idle connections failing their check are replaced"""
+        pool = self.make_pool(check_after=0)
+        stale = pool.get()
+        pool.put(stale)
+        pool.check.side_effect = Exception('server closed the connection')
+
+        connection = pool.get()
+
+        self.assertIsNot(connection, stale)
+        stale.close.assert_called_once_with()
+        self.assertEqual(pool.size, 1)
+
+    def test_unusable_connection_not_pooled(self):
+        """Test connections failing their reset are closed"""
+        pool = self.make_pool()
+        connection = pool.get()
+        pool.reset.side_effect = Exception('connection already closed')
+
+        pool.put(connection)
+
+        connection.close.assert_called_once_with()
+        self.assertEqual((pool.size, pool.idle), (0, []))
+
+
+class GetPoolTests(SimpleTestCase):
+
+    def test_pool_rebuilt_when_params_change(self):
+        """Test a pool follows the connection params of its alias"""
+        old = MagicMock()
+        new = MagicMock()
+
+        params = {'database': 'app'}
+
+        self.assertIs(get_pool('pool-test', params, lambda: old), old)
+        self.assertIs(get_pool('pool-test', dict(params), None), old)
+        self.assertIs(
+            get_pool('pool-test', {'database': 'test_app'}, lambda: new),
+            new
+        )
+        old.clear.assert_called_once_with()
+
+
+class HealthCheckTests(SimpleTestCase):
+
+    @patch('core.signals.connections')
+    def test_unusable_connection_closed(self, connections):
+        """Test broken persistent connections are closed on request start"""
+        conn = MagicMock(in_atomic_block=False)
+        conn.settings_dict = {'CONN_HEALTH_CHECKS': True}
+        conn.is_usable.return_value = False
+        unchecked = MagicMock(settings_dict={})
+        connections.all.return_value = [conn, unchecked]
+
+        check_connections()
+
+        conn.close.assert_called_once_with()
+        unchecked.is_usable.assert_not_called()
@@ -0,0 +1,26 @@
+from django.test import TestCase, override_settings
+
+from core.hashers import TunedArgon2PasswordHasher, \
+    TunedBCryptSHA256PasswordHasher
+
+
+@override_settings(PASSWORD_HASHING={
+    'POLICY': 'argon2',
+    'ARGON2_TIME_COST': 3,
+    'ARGON2_MEMORY_COST': 1024,
+    'ARGON2_PARALLELISM': 4,
+    'BCRYPT_ROUNDS': 8,
+})
+class TunedHasherTests(TestCase):
+
+    def test_argon2_costs_from_settings(self):
+        """Test the argon2 hasher uses the configured costs"""
+        hasher = TunedArgon2PasswordHasher()
+
+        self.assertEqual(hasher.time_cost, 3)
+        self.assertEqual(hasher.memory_cost, 1024)
+        self.assertEqual(hasher.parallelism, 4)
+
+    def test_bcrypt_rounds_from_settings(self):
+        """Test the bcrypt hasher uses the configured rounds"""
+        self.assertEqual(TunedBCryptSHA256PasswordHasher().rounds, 8)
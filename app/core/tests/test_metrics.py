@@ -0,0 +1,104 @@
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.http import HttpResponse
+from django.test import RequestFactory, TestCase, override_settings
+from django.urls import resolve, reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.metrics import RequestMetrics, store
+from core.middleware import MetricsMiddleware
+from core.models import Tag
+
+
+METRICS_URL = reverse('metrics')
+TAGS_URL = reverse('recipe:tag-list')
+
+
+class MetricsTests(TestCase):
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            'test@test.com',
+            'testpass'
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        store.clear()
+        self.addCleanup(store.clear)
+
+    def test_server_timing_header(self):
+        """Test responses report their query count and timings"""
+        res = self.client.get(TAGS_URL)
+
+        timing = res['Server-Timing']
+        self.assertIn('sql;dur=', timing)
+        self.assertIn('queries"', timing)
+        self.assertIn('serialize;dur=', timing)
+        self.assertIn('render;dur=', timing)
+        self.assertIn('total;dur=', timing)
+
+    def test_metrics_recorded_per_view(self):
+        """Test requests are recorded under their resolved view name"""
+        self.client.get(TAGS_URL)
+        self.client.get(TAGS_URL)
+
+        report = store.report()['recipe:tag-list']
+        self.assertEqual(report['count'], 2)
+        self.assertGreater(report['queries']['p50'], 0)
+        self.assertEqual(
+            set(report['total']),
+            {'p50', 'p95', 'p99'}
+        )
+
+    def test_metrics_endpoint_superuser_only(self):
+        """Test only superusers can read the metrics"""
+        res = self.client.get(METRICS_URL)
+        self.assertEqual(res.status_code, status.HTTP_403_FORBIDDEN)
+
+        self.user.is_superuser = True
+        self.user.save()
+        self.client.get(TAGS_URL)
+        res = self.client.get(METRICS_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertIn('recipe:tag-list', res.data)
+
+    @override_settings(METRICS={
+        'ENABLED': True,
+        'SERVER_TIMING': True,
+        'SAMPLES': 10,
+        'DUPLICATE_QUERIES': True,
+        'DUPLICATE_THRESHOLD': 2,
+    })
+    def test_duplicate_queries_flagged(self):
+        """Test statements repeated within a request are logged"""
+        metrics = RequestMetrics(track_duplicates=True)
+        with connection.execute_wrapper(metrics.execute):
+            for pk in range(3):
+                get_user_model().objects.filter(pk=pk).exists()
+            get_user_model().objects.count()
+
+        duplicates = metrics.duplicates(2)
+        self.assertEqual(list(duplicates.values()), [3])
+        self.assertEqual(metrics.queries, 4)
+
+        def n_plus_one(request):
+            for tag in Tag.objects.filter(user=self.user):
+                get_user_model().objects.get(pk=tag.user_id)
+            return HttpResponse()
+
+        Tag.objects.create(user=self.user, name='a')
+        Tag.objects.create(user=self.user, name='b')
+        request = RequestFactory().get(TAGS_URL)
+        request.resolver_match = resolve(TAGS_URL)
+        with self.assertLogs('core.metrics', 'WARNING') as logs:
+            MetricsMiddleware(n_plus_one)(request)
+
+        self.assertEqual(len(logs.output), 1)
+        self.assertIn('Query run 2 times by recipe:tag-list', logs.output[0])
+        self.assertEqual(
+            store.report()['recipe:tag-list']['duplicate_queries'],
+            1
+        )
@@ -0,0 +1,45 @@
+from unittest.mock import patch
+
+from django.test import TestCase, override_settings
+
+from core.throttling import TokenBuckets, take_token
+
+
+CONFIG = {'BACKEND': 'local', 'CACHE_ALIAS': 'default', 'MAX_ENTRIES': 2}
+
+
+class TokenBucketTests(TestCase):
+
+    def test_take_token_refills_over_time(self):
+        """Test a bucket refills at its rate, up to its capacity"""
+        wait, state = take_token(None, 2, 1, 100)
+        self.assertEqual((wait, state), (0, (1, 100)))
+        wait, state = take_token(state, 2, 1, 100)
+        self.assertEqual(wait, 0)
+        wait, state = take_token(state, 2, 1, 100.25)
+        self.assertEqual(wait, 0.75)
+        wait, state = take_token(state, 2, 1, 1000)
+        self.assertEqual((wait, state), (0, (1, 1000)))
+
+    @patch('core.throttling.time.time', return_value=100)
+    def test_local_buckets(self, mock_time):
+        """Test local buckets are independent and bounded"""
+        buckets = TokenBuckets(CONFIG)
+
+        self.assertEqual(buckets.take('a', 1, 0.5), 0)
+        self.assertEqual(buckets.take('a', 1, 0.5), 2)
+        self.assertEqual(buckets.take('b', 1, 0.5), 0)
+        buckets.take('c', 1, 0.5)
+        # 'a' was evicted, so its bucket is full again
+        self.assertEqual(buckets.take('a', 1, 0.5), 0)
+
+    @patch('core.throttling.time.time', return_value=100)
+    def test_shared_buckets(self, mock_time):
+        """Test the django backend keeps buckets in the shared cache"""
+        with override_settings(CACHES={'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'LOCATION': 'throttling-tests',
+        }}):
+            config = dict(CONFIG, BACKEND='django')
+            self.assertEqual(TokenBuckets(config).take('a', 1, 1), 0)
+            self.assertEqual(TokenBuckets(config).take('a', 1, 1), 1)
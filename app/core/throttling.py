@@ -0,0 +1,116 @@
+import hashlib
+import math
+import threading
+import time
+from collections import OrderedDict
+from collections.abc import Mapping
+
+from django.conf import settings
+from django.core.cache import caches
+
+from rest_framework.throttling import BaseThrottle
+
+
+def take_token(state, capacity, rate, now):
+    """Refill a (tokens, timestamp) bucket and take a token from it
+
+    Return the seconds to wait before a token is available, 0 when one
+    was taken, and the new state of the bucket.
+    """
+    tokens, stamp = state or (capacity, now)
+    tokens = min(capacity, tokens + max(0, now - stamp) * rate)
+    if tokens >= 1:
+        return 0, (tokens - 1, now)
+
+    return (1 - tokens) / rate, (tokens, now)
+
+
+class TokenBuckets:
+    """Token buckets by key, in process or in a shared cache
+
+    The local buckets are kept in a bounded LRU; the lock only guards
+    the few arithmetic operations of take_token. With the 'django'
+    backend the buckets live in the CACHE_ALIAS cache, shared between
+    processes if that cache is, updated without atomicity like the DRF
+    throttles are.
+    """
+
+    def __init__(self, config):
+        self.config = config
+        self._local = OrderedDict()
+        self._lock = threading.Lock()
+
+    def take(self, key, capacity, rate):
+        """Take a token from bucket key, return the seconds to wait if none"""
+        now = time.time()
+        if self.config['BACKEND'] == 'django':
+            cache = caches[self.config['CACHE_ALIAS']]
+            wait, state = take_token(cache.get(key), capacity, rate, now)
+            # a full bucket holds no information, let it expire
+            cache.set(key, state, math.ceil(capacity / rate))
+            return wait
+
+        with self._lock:
+            wait, state = take_token(
+                self._local.get(key),
+                capacity,
+                rate,
+                now
+            )
+            self._local[key] = state
+            self._local.move_to_end(key)
+            while len(self._local) > self.config['MAX_ENTRIES']:
+                self._local.popitem(last=False)
+
+        return wait
+
+    def clear(self):
+        """Refill every local bucket"""
+        with self._lock:
+            self._local.clear()
+
+
+login_buckets = TokenBuckets(settings.LOGIN_THROTTLE)
+
+
+class LoginThrottle(BaseThrottle):
+    """Throttle credential checks by client IP and by submitted email
+
+    Views name their buckets with a throttle_scope attribute. The check
+    runs in APIView.initial(), before the serializer authenticates, so
+    rejected requests cost no password hashing.
+    """
+
+    def identities(self, request):
+        """Return the (kind, identity) pairs a request is throttled on"""
+        identities = [('IP', self.get_ident(request))]
+        # malformed bodies are throttled on the IP and left to the view
+        if not isinstance(request.data, Mapping):
+            return identities
+        email = request.data.get('email')
+        if isinstance(email, str) and email.strip():
+            digest = hashlib.sha256(
+                email.strip().lower().encode()
+            ).hexdigest()
+            identities.append(('EMAIL', digest))
+
+        return identities
+
+    def allow_request(self, request, view):
+        config = settings.LOGIN_THROTTLE
+        self.wait_time = 0
+        if not config['ENABLED']:
+            return True
+
+        scope = getattr(view, 'throttle_scope', view.__class__.__name__)
+        for kind, identity in self.identities(request):
+            self.wait_time = max(self.wait_time, login_buckets.take(
+                f'throttle:{scope}:{kind}:{identity}',
+                config[f'{kind}_BURST'],
+                config[f'{kind}_PER_MINUTE'] / 60
+            ))
+
+        return self.wait_time == 0
+
+    def wait(self):
+        return self.wait_time
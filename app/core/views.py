@@ -0,0 +1,23 @@
+from rest_framework.permissions import BasePermission
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from core.authentication import CachedTokenAuthentication
+from core.metrics import store
+
+
+class IsSuperUser(BasePermission):
+    """Allow superusers only"""
+
+    def has_permission(self, request, view):
+        return bool(request.user and request.user.is_superuser)
+
+
+class MetricsView(APIView):
+    """Report the recent query counts and timings of every view"""
+    authentication_classes = CachedTokenAuthentication,
+    permission_classes = IsSuperUser,
+
+    def get(self, request):
+        """Return p50/p95/p99 of the metrics recorded by this process"""
+        return Response(store.report())
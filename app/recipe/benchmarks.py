@@ -0,0 +1,482 @@
+import json
+import random
+import time
+from io import BytesIO
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management.base import CommandError
+from django.db import connection, connections, transaction
+from django.db.models import Prefetch
+from django.db.utils import load_backend
+from django.test.utils import override_settings
+from django.urls import reverse
+from django.utils.module_loading import import_string
+
+from PIL import Image
+from rest_framework.authtoken.models import Token
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIClient
+
+from core.cache import response_cache
+from core.metrics import percentile
+from core.models import Tag, Ingredient, Recipe
+
+from .fast_serializers import FastSerializer
+from .filters import filter_recipes, filter_assigned
+from .search import recipe_index, search_recipes, update_search, \
+    uses_postgres
+from .serializers import RecipeSerializer, RecipeDetailSerializer
+
+
+SCENARIOS = {}
+
+INDEXES = (
+    'core_tag_user_name_idx',
+    'core_ingredient_user_name_idx',
+    'core_recipe_user_id_idx',
+    'core_recipe_tags_tag_recipe_idx',
+    'core_recipe_ingredients_ingredient_recipe_idx',
+)
+
+
+def scenario(name):
+    """Register a benchmark scenario under name"""
+    def decorator(func):
+        SCENARIOS[name] = func
+        return func
+
+    return decorator
+
+
+class Timer:
+    """Context manager measuring the wall clock time of a block"""
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.elapsed = time.perf_counter() - self.start
+
+
+def _bulk_create(model, objs, batch_size):
+    """bulk_create objs and return their primary keys in order"""
+    created = model.objects.bulk_create(objs, batch_size=batch_size)
+    if created and created[0].pk is None:
+        # backends that cannot return ids from bulk inserts
+        ids = model.objects.order_by('-id').values_list('id', flat=True)
+        for obj, pk in zip(created, reversed(ids[:len(created)])):
+            obj.pk = pk
+
+    return [obj.pk for obj in created]
+
+
+def generate_dataset(users=1, recipes=1000, tags=50, ingredients=200,
+                     tags_per_recipe=3, ingredients_per_recipe=8,
+                     batch_size=5000, seed=0):
+    """Bulk insert a synthetic dataset and return the users created
+
+    Every user gets `recipes` recipes linked to a random sample of their
+    own tags and ingredients, giving a realistic many to many fan out.
+    """
+    rand = random.Random(seed)
+    suffix = f'{seed}-{time.time_ns()}'
+    created_users = []
+    for i in range(users):
+        user = get_user_model()(email=f'bench-{i}-{suffix}@example.com')
+        user.set_unusable_password()
+        user.save()
+        created_users.append(user)
+
+        tag_ids = _bulk_create(Tag, [
+            Tag(user=user, name=f'tag {n}') for n in range(tags)
+        ], batch_size)
+        ingredient_ids = _bulk_create(Ingredient, [
+            Ingredient(user=user, name=f'ingredient {n}')
+            for n in range(ingredients)
+        ], batch_size)
+
+        for start in range(0, recipes, batch_size):
+            count = min(batch_size, recipes - start)
+            recipe_ids = _bulk_create(Recipe, [
+                Recipe(
+                    user=user,
+                    title=f'recipe {start + n}',
+                    time_minutes=rand.randint(5, 120),
+                    price=rand.randint(100, 9999) / 100,
+                )
+                for n in range(count)
+            ], batch_size)
+
+            Recipe.tags.through.objects.bulk_create([
+                Recipe.tags.through(recipe_id=recipe_id, tag_id=tag_id)
+                for recipe_id in recipe_ids
+                for tag_id in rand.sample(
+                    tag_ids, min(tags_per_recipe, len(tag_ids))
+                )
+            ], batch_size=batch_size)
+            Recipe.ingredients.through.objects.bulk_create([
+                Recipe.ingredients.through(
+                    recipe_id=recipe_id,
+                    ingredient_id=ingredient_id
+                )
+                for recipe_id in recipe_ids
+                for ingredient_id in rand.sample(
+                    ingredient_ids,
+                    min(ingredients_per_recipe, len(ingredient_ids))
+                )
+            ], batch_size=batch_size)
+
+    return created_users
+
+
+def time_queryset(queryset, repeat=5):
+    """Return the best wall clock time of evaluating queryset"""
+    timings = []
+    for _ in range(repeat):
+        with Timer() as timer:
+            list(queryset.all())
+        timings.append(timer.elapsed)
+
+    return min(timings)
+
+
+def explain(queryset):
+    """Return the query plan of queryset, with timings where supported"""
+    if connection.vendor == 'postgresql':
+        return queryset.explain(analyze=True)
+
+    return queryset.explain()
+
+
+@scenario('indexes')
+def explain_indexes(users, stdout, options):
+    """Print the plans of the per user listing and filtering queries"""
+    user = users[0]
+    tag = Tag.objects.filter(user=user).first()
+    ingredient = Ingredient.objects.filter(user=user).first()
+    queries = {
+        'tags': Tag.objects.filter(user=user).order_by('-name', 'id')[:50],
+        'ingredients': Ingredient.objects.filter(
+            user=user
+        ).order_by('-name', 'id')[:50],
+        'recipes': Recipe.objects.filter(user=user).order_by('-id')[:50],
+        'recipes by tag': filter_recipes(
+            Recipe.objects.filter(user=user),
+            {'tags': str(tag.id)}
+        ).order_by('-id')[:50],
+        'recipes by ingredient': filter_recipes(
+            Recipe.objects.filter(user=user),
+            {'ingredients': str(ingredient.id)}
+        ).order_by('-id')[:50],
+    }
+
+    def print_plans(label):
+        for name, queryset in queries.items():
+            stdout.write(f'== {name} ({label})')
+            stdout.write(explain(queryset))
+
+    print_plans('with indexes')
+    if options.get('compare'):
+        # the dropped indexes are always restored, even with --keep
+        savepoint = transaction.savepoint()
+        try:
+            with connection.cursor() as cursor:
+                for index in INDEXES:
+                    cursor.execute(f'DROP INDEX IF EXISTS {index}')
+            print_plans('without indexes')
+        finally:
+            transaction.savepoint_rollback(savepoint)
+
+
+@scenario('assigned_only')
+def assigned_only(users, stdout, options):
+    """Time the assigned_only tag filter against the previous join"""
+    user = users[0]
+    queryset = filter_assigned(
+        Tag.objects.filter(user=user),
+        Recipe.tags.through,
+        'tag_id'
+    ).order_by('-name')
+    stdout.write(explain(queryset))
+    stdout.write(f'exists semi-join: {time_queryset(queryset) * 1000:.2f}ms')
+
+    if options.get('compare'):
+        joined = Tag.objects.filter(recipe__isnull=False)
+        stdout.write(explain(joined))
+        stdout.write(f'join: {time_queryset(joined) * 1000:.2f}ms')
+
+
+@scenario('serializers')
+def render_recipes(users, stdout, options):
+    """Compare the rows per second of the DRF and fast recipe renderers"""
+    recipes = Recipe.objects.filter(user=users[0]).order_by('-id')
+    renderer = JSONRenderer()
+    for serializer_class, fields in (
+        (RecipeSerializer, ('id',)),
+        (RecipeDetailSerializer, ('id', 'name')),
+    ):
+        name = serializer_class.__name__
+        queryset = recipes.prefetch_related(
+            Prefetch('tags', Tag.objects.only(*fields).order_by('id')),
+            Prefetch(
+                'ingredients',
+                Ingredient.objects.only(*fields).order_by('id')
+            ),
+        )
+        with Timer() as timer:
+            rendered = renderer.render(
+                serializer_class(queryset, many=True).data
+            )
+        count = queryset.count()
+        stdout.write(f'{name} drf: {count / timer.elapsed:.0f} rows/s')
+
+        fast = FastSerializer(serializer_class)
+        with Timer() as timer:
+            fast_rendered = renderer.render(
+                fast.serialize(fast.values(recipes))
+            )
+        stdout.write(f'{name} fast: {count / timer.elapsed:.0f} rows/s')
+        stdout.write(
+            f'{name} identical output: {rendered == fast_rendered}'
+        )
+
+
+@scenario('connections')
+def connection_setup(users, stdout, options):
+    """Time queries opening a fresh connection against reused ones"""
+    settings_dict = connections['default'].settings_dict
+    engine = settings_dict['ENGINE']
+    modes = [('fresh', engine, True), ('persistent', engine, False)]
+    if connection.vendor == 'postgresql':
+        modes.append(('pooled', 'core.db.backends.postgresql_pool', True))
+
+    for name, engine, close in modes:
+        wrapper = load_backend(engine).DatabaseWrapper(
+            dict(settings_dict, ENGINE=engine),
+            alias=f'benchmark-{name}'
+        )
+        timings = []
+        for _ in range(options.get('iterations') or 200):
+            with Timer() as timer:
+                with wrapper.cursor() as cursor:
+                    cursor.execute('SELECT 1')
+                if close:
+                    wrapper.close()
+            timings.append(timer.elapsed * 1000)
+        wrapper.close()
+        if name == 'pooled':
+            wrapper.pool.clear()
+
+        timings.sort()
+        stdout.write(
+            f'{name}: p50 {timings[len(timings) // 2]:.3f}ms '
+            f'p95 {timings[int(len(timings) * 0.95)]:.3f}ms'
+        )
+
+
+@scenario('search')
+def search(users, stdout, options):
+    """Time ranked full text searches over the recipes of a user"""
+    user = users[0]
+    with Timer() as timer:
+        if uses_postgres():
+            # the dataset is bulk inserted, bypassing the signals
+            update_search(Recipe.objects.all())
+        else:
+            recipe_index.build()
+    stdout.write(f'search data built in {timer.elapsed:.2f}s')
+
+    for terms in ('recipe', 'tag 1', 'ingredient 7 recipe', 'missing'):
+        queryset = search_recipes(
+            Recipe.objects.filter(user=user),
+            terms,
+            user.pk
+        ).order_by('-search_rank', '-id')[:50]
+        stdout.write(
+            f'{terms!r}: {time_queryset(queryset) * 1000:.2f}ms'
+        )
+    if uses_postgres():
+        stdout.write(explain(queryset))
+    else:
+        # the index would outlive the rolled back dataset
+        recipe_index.clear()
+
+
+@scenario('hashers')
+def password_hashers(users, stdout, options):
+    """Measure the CPU cost of a login with every password hasher policy"""
+    password = 'benchmark-password'
+    for policy, path in settings.PASSWORD_HASHER_POLICIES.items():
+        hasher = import_string(path)()
+        try:
+            encoded = hasher.encode(password, hasher.salt())
+        except ValueError as error:
+            # argon2-cffi or bcrypt missing
+            stdout.write(f'{policy}: unavailable ({error})')
+            continue
+
+        iterations = options.get('iterations') or 200
+        cpu_start = time.process_time()
+        with Timer() as timer:
+            for _ in range(iterations):
+                hasher.verify(password, encoded)
+        cpu = (time.process_time() - cpu_start) / iterations
+        stdout.write(
+            f'{policy}: {cpu * 1000:.2f}ms cpu '
+            f'{timer.elapsed / iterations * 1000:.2f}ms wall per login, '
+            f'{1 / cpu if cpu else float("inf"):.0f} logins/s per core'
+        )
+
+
+def compare_to_baseline(results, baseline, tolerance):
+    """Return a message for every operation slower than its baseline"""
+    regressions = []
+    for name, timings in sorted(results.items()):
+        if name not in baseline:
+            continue
+        limit = baseline[name]['p50'] * (1 + tolerance)
+        if timings['p50'] > limit:
+            regressions.append(
+                f'{name}: p50 {timings["p50"]:.2f}ms > {limit:.2f}ms '
+                f'(baseline {baseline[name]["p50"]:.2f}ms)'
+            )
+
+    return regressions
+
+
+def _image():
+    """Return a small JPEG image file"""
+    image_file = BytesIO()
+    Image.new('RGB', (64, 64)).save(image_file, format='JPEG')
+    image_file.name = 'image.jpg'
+    image_file.seek(0)
+
+    return image_file
+
+
+@scenario('api')
+def api(users, stdout, options):
+    """Time the main API operations through the test client
+
+    With --baseline the p50 of every operation is compared to the ones
+    stored in that JSON file, failing on regressions beyond --tolerance;
+    --save-baseline writes the results there instead.
+    """
+    user = users[0]
+    password = 'benchmark-password'
+    user.set_password(password)
+    user.save()
+    token = Token.objects.create(user=user)
+    client = APIClient()
+    client.credentials(HTTP_AUTHORIZATION=f'Token {token.key}')
+
+    recipe_ids = list(
+        Recipe.objects.filter(user=user).values_list('id', flat=True)
+    )
+    tag_ids = list(Tag.objects.filter(user=user).values_list('id', flat=True))
+    ingredient_ids = list(
+        Ingredient.objects.filter(user=user).values_list('id', flat=True)
+    )
+    rand = random.Random(0)
+    recipes_url = reverse('recipe:recipe-list')
+
+    def list_cold():
+        response_cache.invalidate(user.pk)
+        return client.get(recipes_url)
+
+    def detail():
+        return client.get(
+            reverse('recipe:recipe-detail', args=[rand.choice(recipe_ids)])
+        )
+
+    def filtered_list():
+        return client.get(recipes_url, {
+            'tags': ','.join(map(str, rand.sample(tag_ids, 2))),
+        })
+
+    def create():
+        return client.post(recipes_url, {
+            'title': 'benchmark recipe',
+            'time_minutes': 10,
+            'price': '5.00',
+            'tags': rand.sample(tag_ids, 2),
+            'ingredients': rand.sample(ingredient_ids, 3),
+        }, format='json')
+
+    def upload_image():
+        recipe = Recipe.objects.get(pk=rand.choice(recipe_ids))
+        response = client.patch(
+            reverse('recipe:recipe-upload-image', args=[recipe.pk]),
+            {'image': _image()},
+            format='multipart'
+        )
+        recipe.refresh_from_db()
+        for field in ('image', 'image_thumbnail', 'image_medium'):
+            getattr(recipe, field).delete(save=False)
+        return response
+
+    def token_auth():
+        return client.get(reverse('user:me'))
+
+    def token_create():
+        return APIClient().post(reverse('user:token'), {
+            'email': user.email,
+            'password': password,
+        })
+
+    operations = (
+        ('list', list_cold, 200),
+        ('list cached', lambda: client.get(recipes_url), 200),
+        ('filtered list', filtered_list, 200),
+        ('detail', detail, 200),
+        ('create', create, 201),
+        ('upload image', upload_image, 200),
+        ('token auth', token_auth, 200),
+        ('token create', token_create, 200),
+    )
+    results = {}
+    with override_settings(
+        ALLOWED_HOSTS=['testserver', *settings.ALLOWED_HOSTS],
+        # token create logs in as the same user on every iteration
+        LOGIN_THROTTLE={**settings.LOGIN_THROTTLE, 'ENABLED': False}
+    ):
+        for name, operation, expected_status in operations:
+            timings = []
+            for _ in range(options.get('iterations') or 200):
+                with Timer() as timer:
+                    response = operation()
+                if response.status_code != expected_status:
+                    raise CommandError(
+                        f'{name}: expected {expected_status}, '
+                        f'got {response.status_code}'
+                    )
+                timings.append(timer.elapsed * 1000)
+            timings.sort()
+            results[name] = {
+                'p50': percentile(timings, 0.5),
+                'p95': percentile(timings, 0.95),
+            }
+            stdout.write(
+                f'{name}: p50 {results[name]["p50"]:.2f}ms '
+                f'p95 {results[name]["p95"]:.2f}ms'
+            )
+
+    path = options.get('baseline')
+    if path and options.get('save_baseline'):
+        with open(path, 'w') as baseline_file:
+            json.dump(results, baseline_file, indent=2, sort_keys=True)
+        stdout.write(f'baseline saved to {path}')
+    elif path:
+        with open(path) as baseline_file:
+            regressions = compare_to_baseline(
+                results,
+                json.load(baseline_file),
+                options.get('tolerance', 0.25)
+            )
+        if regressions:
+            raise CommandError(
+                'Performance regressions:\n' + '\n'.join(regressions)
+            )
+        stdout.write('no regression against the baseline')
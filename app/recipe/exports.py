@@ -0,0 +1,58 @@
+import json
+from itertools import islice
+
+from rest_framework.utils.encoders import JSONEncoder
+
+
+FORMATS = {
+    'json': 'application/json',
+    'ndjson': 'application/x-ndjson',
+}
+
+
+def _dumps(data):
+    """Encode data the way DRF's JSONRenderer does"""
+    return json.dumps(
+        data,
+        cls=JSONEncoder,
+        ensure_ascii=False,
+        separators=(',', ':')
+    )
+
+
+def iter_chunks(serializer, queryset, chunk_size):
+    """Yield the representations of queryset, chunk_size rows at a time
+
+    Rows come from a server-side cursor where the backend has one, and
+    the relations of each chunk are fetched along with it, so memory use
+    does not grow with the size of the queryset.
+    """
+    rows = serializer.values(queryset).iterator(chunk_size=chunk_size)
+    while True:
+        chunk = list(islice(rows, chunk_size))
+        if not chunk:
+            return
+        yield serializer.serialize(chunk)
+
+
+def stream_json(serializer, queryset, chunk_size):
+    """Yield queryset as the pieces of one JSON array"""
+    yield '['
+    separator = ''
+    for chunk in iter_chunks(serializer, queryset, chunk_size):
+        for item in chunk:
+            yield separator + _dumps(item)
+            separator = ','
+    yield ']'
+
+
+def stream_ndjson(serializer, queryset, chunk_size):
+    """Yield queryset as newline delimited JSON, one chunk at a time"""
+    for chunk in iter_chunks(serializer, queryset, chunk_size):
+        yield ''.join(_dumps(item) + '\n' for item in chunk)
+
+
+STREAMS = {
+    'json': stream_json,
+    'ndjson': stream_ndjson,
+}
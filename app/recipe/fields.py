@@ -0,0 +1,82 @@
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.utils.translation import gettext_lazy as _
+
+from rest_framework import serializers
+from rest_framework.relations import ManyRelatedField, MANY_RELATION_KWARGS
+
+
+class BatchedManyRelatedField(ManyRelatedField):
+    """Many related field resolving every primary key in one query
+
+    Bulk serializers can resolve the keys of all their items up front
+    and share them through context['related_objects'].
+    """
+    default_error_messages = {
+        'does_not_exist': _('Invalid pk(s) "{pk_value}" - '
+                            'object(s) do not exist.'),
+    }
+
+    def to_pks(self, data):
+        """Return the primary keys in data, raising on malformed input"""
+        if isinstance(data, str) or not hasattr(data, '__iter__'):
+            self.fail('not_a_list', input_type=type(data).__name__)
+        if not self.allow_empty and len(data) == 0:
+            self.fail('empty')
+
+        pk_field = self.child_relation.get_queryset().model._meta.pk
+        pks = []
+        for item in data:
+            try:
+                if isinstance(item, bool):
+                    raise TypeError
+                pks.append(pk_field.to_python(item))
+            except (TypeError, ValueError, DjangoValidationError):
+                self.child_relation.fail(
+                    'incorrect_type',
+                    data_type=type(item).__name__
+                )
+
+        return pks
+
+    def get_objects(self, pks):
+        """Return a pk to object mapping for pks"""
+        prefetched = self.context.get('related_objects', {})
+        if self.field_name in prefetched:
+            return prefetched[self.field_name]
+
+        return self.child_relation.get_queryset().in_bulk(pks)
+
+    def to_internal_value(self, data):
+        """Return the distinct related objects of data, in order"""
+        pks = list(dict.fromkeys(self.to_pks(data)))
+        objects = self.get_objects(pks)
+        missing = [pk for pk in pks if pk not in objects]
+        if missing:
+            self.fail(
+                'does_not_exist',
+                pk_value=', '.join(str(pk) for pk in missing)
+            )
+
+        return [objects[pk] for pk in pks]
+
+
+class UserPrimaryKeyRelatedField(serializers.PrimaryKeyRelatedField):
+    """Primary key field limited to the objects of the requesting user"""
+
+    @classmethod
+    def many_init(cls, *args, **kwargs):
+        list_kwargs = {'child_relation': cls(*args, **kwargs)}
+        for key in kwargs:
+            if key in MANY_RELATION_KWARGS:
+                list_kwargs[key] = kwargs[key]
+
+        return BatchedManyRelatedField(**list_kwargs)
+
+    def get_queryset(self):
+        """Scope the queryset to the user of the request, if any"""
+        queryset = super().get_queryset()
+        request = self.context.get('request')
+        if request is not None:
+            queryset = queryset.filter(user=request.user)
+
+        return queryset
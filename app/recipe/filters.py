@@ -0,0 +1,94 @@
+from django.db.models import Count, Exists, IntegerField, OuterRef, \
+    Subquery
+from django.db.models.functions import Coalesce
+from django.utils.translation import gettext_lazy as _
+
+from rest_framework.exceptions import ValidationError
+
+from core.models import Recipe
+
+
+MATCH_ANY = 'any'
+MATCH_ALL = 'all'
+MATCH_MODES = (MATCH_ANY, MATCH_ALL)
+
+RELATED_FILTERS = (
+    ('tags', Recipe.tags.through, 'tag_id'),
+    ('ingredients', Recipe.ingredients.through, 'ingredient_id'),
+)
+
+
+def params_to_ints(name, value):
+    """convert a comma separated string of ids to a list of integers"""
+    try:
+        return sorted({int(str_id) for str_id in value.split(',')})
+    except ValueError:
+        raise ValidationError(
+            {name: _('Expected a comma separated list of ids.')}
+        )
+
+
+def param_to_bool(name, value):
+    """convert a 0/1 query param to a boolean"""
+    try:
+        return bool(int(value or 0))
+    except ValueError:
+        raise ValidationError({name: _('Expected 0 or 1.')})
+
+
+def filter_related(queryset, through, field, ids, match=MATCH_ANY):
+    """Filter recipes linked to ids with EXISTS semi-joins
+
+    Unlike joining the through table, a semi-join never duplicates a
+    recipe however many of the ids it is linked to.
+    """
+    links = through.objects.filter(recipe_id=OuterRef('pk'))
+    if match == MATCH_ALL:
+        for related_id in ids:
+            queryset = queryset.filter(
+                Exists(links.filter(**{field: related_id}))
+            )
+        return queryset
+
+    return queryset.filter(Exists(links.filter(**{f'{field}__in': ids})))
+
+
+def filter_recipes(queryset, query_params):
+    """Apply the tags, ingredients and match query params to queryset"""
+    match = query_params.get('match', MATCH_ANY)
+    if match not in MATCH_MODES:
+        raise ValidationError(
+            {'match': _('Expected one of: %s.') % ', '.join(MATCH_MODES)}
+        )
+
+    for name, through, field in RELATED_FILTERS:
+        value = query_params.get(name)
+        if value:
+            ids = params_to_ints(name, value)
+            queryset = filter_related(queryset, through, field, ids, match)
+
+    return queryset
+
+
+def filter_assigned(queryset, through, field):
+    """Keep only the tags or ingredients assigned to at least one recipe
+
+    `field` is the column of the through table pointing at the filtered
+    model. The EXISTS semi-join returns every row once and keeps the
+    ordering and user scoping of queryset.
+    """
+    return queryset.filter(
+        Exists(through.objects.filter(**{field: OuterRef('pk')}))
+    )
+
+
+def annotate_recipe_count(queryset, through, field):
+    """Annotate each tag or ingredient with the number of its recipes"""
+    counts = through.objects.filter(
+        **{field: OuterRef('pk')}
+    ).order_by().values(field).annotate(count=Count('*')).values('count')
+
+    return queryset.annotate(recipe_count=Coalesce(
+        Subquery(counts, output_field=IntegerField()),
+        0
+    ))
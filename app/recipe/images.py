@@ -0,0 +1,87 @@
+from io import BytesIO
+
+from PIL import Image, ImageOps
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.utils import timezone
+
+from core.models import Recipe
+from core.signals import invalidate_responses
+
+
+FORMAT_EXTENSIONS = {'JPEG': 'jpg', 'WEBP': 'webp'}
+
+
+def render_variant(image, size):
+    """Return the bytes of image resized to fit within size"""
+    variant = image.copy()
+    variant.thumbnail(size, Image.LANCZOS)
+    buffer = BytesIO()
+    variant.save(
+        buffer,
+        format=settings.RECIPE_IMAGE_FORMAT,
+        quality=settings.RECIPE_IMAGE_QUALITY,
+        optimize=True
+    )
+
+    return buffer.getvalue()
+
+
+def set_image_status(recipe, original, status, **fields):
+    """Update the image status of a recipe still holding image original
+
+    Like saving it would, bump `modified` and invalidate the cached
+    responses of its owner. Return whether the recipe was updated.
+    """
+    updated = Recipe.objects.filter(pk=recipe.pk, image=original).update(
+        image_status=status,
+        modified=timezone.now(),
+        **fields
+    )
+    if updated:
+        invalidate_responses(recipe.user_id)
+
+    return bool(updated)
+
+
+def process_recipe_image(recipe_id):
+    """Generate the resized variants of a recipe image"""
+    recipe = Recipe.objects.filter(pk=recipe_id).first()
+    if recipe is None or not recipe.image:
+        return
+    original = recipe.image.name
+    set_image_status(recipe, original, Recipe.IMAGE_PROCESSING)
+
+    ext = FORMAT_EXTENSIONS[settings.RECIPE_IMAGE_FORMAT]
+    variants = {}
+    try:
+        with recipe.image.open('rb') as image_file:
+            with Image.open(image_file) as image:
+                largest = max(settings.RECIPE_IMAGE_VARIANTS.values())
+                # let JPEG decode at a reduced scale when it can
+                image.draft('RGB', largest)
+                image = ImageOps.exif_transpose(image).convert('RGB')
+                for name, size in settings.RECIPE_IMAGE_VARIANTS.items():
+                    field = getattr(recipe, f'image_{name}')
+                    field.save(
+                        f'{name}.{ext}',
+                        ContentFile(render_variant(image, size)),
+                        save=False
+                    )
+                    variants[f'image_{name}'] = field.name
+    except (OSError, ValueError):
+        for name in variants.values():
+            recipe.image.storage.delete(name)
+        set_image_status(recipe, original, Recipe.IMAGE_FAILED)
+        return
+
+    # a newer upload replaced the image while it was being processed
+    if not set_image_status(
+        recipe,
+        original,
+        Recipe.IMAGE_READY,
+        **variants
+    ):
+        for name in variants.values():
+            recipe.image.storage.delete(name)
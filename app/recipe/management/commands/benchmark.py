@@ -0,0 +1,91 @@
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+
+from recipe import benchmarks
+
+
+class Command(BaseCommand):
+    """Django command to run a performance benchmark scenario"""
+    help = 'Generate a synthetic dataset and run a benchmark scenario'
+
+    def add_arguments(self, parser):
+        parser.add_argument('scenario', choices=sorted(benchmarks.SCENARIOS))
+        parser.add_argument('--users', type=int, default=1)
+        parser.add_argument('--recipes', type=int, default=10000)
+        parser.add_argument('--tags', type=int, default=50)
+        parser.add_argument('--ingredients', type=int, default=200)
+        parser.add_argument('--tags-per-recipe', type=int, default=3)
+        parser.add_argument('--ingredients-per-recipe', type=int, default=8)
+        parser.add_argument('--batch-size', type=int, default=5000)
+        parser.add_argument(
+            '--iterations',
+            type=int,
+            default=200,
+            help='repetitions of the timed operation, where applicable'
+        )
+        parser.add_argument(
+            '--compare',
+            action='store_true',
+            help='also run the scenario without the optimization'
+        )
+        parser.add_argument(
+            '--keep',
+            action='store_true',
+            help='commit the generated data instead of rolling it back'
+        )
+        parser.add_argument(
+            '--test-db',
+            action='store_true',
+            help='run in a freshly created test database, destroyed after'
+        )
+        parser.add_argument(
+            '--baseline',
+            help='JSON file of baseline timings to compare the results to'
+        )
+        parser.add_argument(
+            '--save-baseline',
+            action='store_true',
+            help='write the results to --baseline instead of comparing'
+        )
+        parser.add_argument(
+            '--tolerance',
+            type=float,
+            default=0.25,
+            help='allowed slowdown against the baseline, 0.25 for 25%%'
+        )
+
+    def handle(self, *args, **options):
+        if not options['test_db']:
+            self.run(options)
+            return
+
+        old_name = connection.creation.create_test_db(verbosity=0)
+        try:
+            self.run(options)
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+
+    def run(self, options):
+        """Generate the dataset and run the scenario in a transaction"""
+        self.stdout.write('generating dataset...')
+        with transaction.atomic():
+            with benchmarks.Timer() as timer:
+                users = benchmarks.generate_dataset(
+                    users=options['users'],
+                    recipes=options['recipes'],
+                    tags=options['tags'],
+                    ingredients=options['ingredients'],
+                    tags_per_recipe=options['tags_per_recipe'],
+                    ingredients_per_recipe=options['ingredients_per_recipe'],
+                    batch_size=options['batch_size'],
+                )
+            self.stdout.write(f'dataset generated in {timer.elapsed:.2f}s')
+
+            benchmarks.SCENARIOS[options['scenario']](
+                users,
+                self.stdout,
+                options
+            )
+
+            if not options['keep']:
+                transaction.set_rollback(True)
@@ -0,0 +1,35 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from core.models import Recipe
+
+from recipe.images import process_recipe_image
+
+
+class Command(BaseCommand):
+    """Django command to process the recipe images left unprocessed"""
+    help = 'Generate the variants of images stuck pending or processing'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--older-than',
+            type=int,
+            default=600,
+            help='seconds since the last change of the recipes to pick up'
+        )
+
+    def handle(self, *args, **options):
+        cutoff = timezone.now() - timedelta(seconds=options['older_than'])
+        # tasks queued in memory are lost when their worker exits
+        stale = Recipe.objects.filter(
+            image_status__in=(Recipe.IMAGE_PENDING, Recipe.IMAGE_PROCESSING),
+            modified__lte=cutoff
+        ).values_list('pk', flat=True)
+        count = 0
+        for pk in stale.iterator():
+            process_recipe_image(pk)
+            count += 1
+
+        self.stdout.write(self.style.SUCCESS(f'processed {count} images'))
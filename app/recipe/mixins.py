@@ -0,0 +1,322 @@
+import hashlib
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, Max
+from django.http import Http404, HttpResponse, HttpResponseNotModified
+from django.utils.cache import get_conditional_response, patch_vary_headers
+from django.utils.http import http_date, parse_etags, quote_etag
+from django.utils.translation import gettext_lazy as _
+
+from rest_framework import status
+from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
+from rest_framework.response import Response
+
+from core.cache import response_cache
+from core.signals import invalidate_responses
+
+from .fast_serializers import FastSerializer
+from .search import refresh_search
+
+
+def make_etag(*parts):
+    """Return a quoted ETag derived from parts"""
+    digest = hashlib.md5(repr(parts).encode()).hexdigest()
+
+    return quote_etag(digest)
+
+
+class ConditionalGetMixin:
+    """Answer conditional list and retrieve requests without serializing
+
+    Validators come from the `modified` timestamp of the objects: the
+    latest one plus the row count for a collection, the object's own
+    for a detail. A matching If-None-Match (or If-Modified-Since for
+    details) returns 304 Not Modified before the serializer runs.
+    """
+
+    def _conditional_response(self, request, etag, last_modified=None):
+        """Return a 304 response if the request validators match"""
+        timestamp = int(last_modified.timestamp()) if last_modified else None
+        response = get_conditional_response(
+            request,
+            etag=etag,
+            last_modified=timestamp
+        )
+        if response is not None:
+            self._set_validators(response, etag, last_modified)
+
+        return response
+
+    def _set_validators(self, response, etag, last_modified=None):
+        """Add the validator headers to response"""
+        response['ETag'] = etag
+        if last_modified is not None:
+            response['Last-Modified'] = http_date(last_modified.timestamp())
+        patch_vary_headers(response, ('Authorization',))
+
+    def _etag(self, request, *parts):
+        """Return the ETag of the current user's view of parts"""
+        return make_etag(
+            request.user.pk,
+            request.accepted_renderer.format,
+            request.get_full_path(),
+            *parts
+        )
+
+    def list(self, request, *args, **kwargs):
+        """List objects unless the client's copy is still current"""
+        state = self.filter_queryset(self.get_queryset()).order_by().aggregate(
+            last_modified=Max('modified'),
+            count=Count('pk')
+        )
+        etag = self._etag(request, state['last_modified'], state['count'])
+        # deletions do not move the latest timestamp, so collections
+        # are validated by ETag only
+        response = self._conditional_response(request, etag)
+        if response is not None:
+            return response
+
+        response = super().list(request, *args, **kwargs)
+        self._set_validators(response, etag)
+
+        return response
+
+    def retrieve(self, request, *args, **kwargs):
+        """Retrieve an object unless the client's copy is still current"""
+        lookup_url_kwarg = self.lookup_url_kwarg or self.lookup_field
+        try:
+            last_modified = self.filter_queryset(self.get_queryset()).filter(
+                **{self.lookup_field: self.kwargs[lookup_url_kwarg]}
+            ).values_list('modified', flat=True).first()
+        except (TypeError, ValueError):
+            last_modified = None
+        if last_modified is None:
+            return super().retrieve(request, *args, **kwargs)
+
+        etag = self._etag(request, last_modified)
+        response = self._conditional_response(request, etag, last_modified)
+        if response is not None:
+            return response
+
+        response = super().retrieve(request, *args, **kwargs)
+        self._set_validators(response, etag, last_modified)
+
+        return response
+
+
+class FastSerializationMixin:
+    """Render list and retrieve responses from .values() rows
+
+    Enabled by the RECIPE_FAST_SERIALIZATION setting. The output is the
+    same as the one of the regular serializers, see FastSerializer.
+    """
+
+    def _fast_serializer(self):
+        """Return a FastSerializer mirroring the serializer of the action"""
+        return FastSerializer(
+            self.get_serializer_class(),
+            self.get_serializer_context()
+        )
+
+    def list(self, request, *args, **kwargs):
+        if not settings.RECIPE_FAST_SERIALIZATION:
+            return super().list(request, *args, **kwargs)
+
+        serializer = self._fast_serializer()
+        rows = serializer.values(self.filter_queryset(self.get_queryset()))
+        page = self.paginate_queryset(rows)
+        if page is not None:
+            return self.get_paginated_response(serializer.serialize(page))
+
+        return Response(serializer.serialize(rows))
+
+    def retrieve(self, request, *args, **kwargs):
+        if not settings.RECIPE_FAST_SERIALIZATION:
+            return super().retrieve(request, *args, **kwargs)
+
+        serializer = self._fast_serializer()
+        lookup_url_kwarg = self.lookup_url_kwarg or self.lookup_field
+        try:
+            rows = serializer.values(
+                self.filter_queryset(self.get_queryset()).filter(
+                    **{self.lookup_field: self.kwargs[lookup_url_kwarg]}
+                )
+            )[:1]
+            data = serializer.serialize(rows)
+        except (TypeError, ValueError):
+            data = None
+        if not data:
+            raise Http404
+
+        return Response(data[0])
+
+
+class CachedListMixin:
+    """Serve list requests from the per user cache of rendered responses
+
+    Only JSON responses are cached. Entries are keyed by the view, the
+    normalized query params and the accepted media type, and are
+    invalidated by the model signals of core.signals.
+    """
+    cache_formats = ('json',)
+
+    def list(self, request, *args, **kwargs):
+        """Return the cached response of this list request if any"""
+        self._response_cache_key = None
+        if request.accepted_renderer.format not in self.cache_formats:
+            return super().list(request, *args, **kwargs)
+
+        self._response_cache_key = response_cache.make_key(
+            request.user.pk,
+            request.resolver_match.view_name,
+            sorted(request.query_params.lists()),
+            request.accepted_media_type
+        )
+        cached = response_cache.get(self._response_cache_key)
+        if cached is None:
+            return super().list(request, *args, **kwargs)
+
+        self._response_cache_key = None
+        content, content_type, etag = cached
+        if etag and etag in parse_etags(
+            request.META.get('HTTP_IF_NONE_MATCH', '')
+        ):
+            response = HttpResponseNotModified()
+        else:
+            response = HttpResponse(content, content_type=content_type)
+        if etag:
+            response['ETag'] = etag
+        patch_vary_headers(response, ('Authorization',))
+
+        return response
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        """Store successful rendered list responses in the cache"""
+        response = super().finalize_response(
+            request,
+            response,
+            *args,
+            **kwargs
+        )
+        key = getattr(self, '_response_cache_key', None)
+        if key and isinstance(response, Response) and \
+                response.status_code == 200:
+            response.render()
+            response_cache.set(key, (
+                response.content,
+                response['Content-Type'],
+                response.get('ETag'),
+            ))
+
+        return response
+
+
+class BulkModelMixin:
+    """Create, update or delete many objects of the user in one request
+
+    POST takes a list of objects, PATCH a list of partial objects with
+    their id and DELETE an object with the list of ids to delete. Every
+    item is validated before anything is written, errors are reported
+    per item and the writes happen in a single transaction.
+    """
+
+    def _check_items(self, items):
+        """Validate the shape and size of a bulk payload"""
+        if not isinstance(items, list):
+            raise ValidationError(_('Expected a list of items.'))
+        if len(items) > settings.BULK_MAX_ITEMS:
+            raise ValidationError(
+                _('At most %d items can be sent at once.')
+                % settings.BULK_MAX_ITEMS
+            )
+
+    def _get_instances(self, ids):
+        """Return the user's objects for ids in order, or raise per item"""
+        valid = [
+            isinstance(pk, int) and not isinstance(pk, bool) for pk in ids
+        ]
+        found = self.get_queryset().in_bulk([
+            pk for pk, is_valid in zip(ids, valid) if is_valid
+        ])
+        seen = set()
+        errors = []
+        for pk, is_valid in zip(ids, valid):
+            if not is_valid:
+                errors.append({'id': [_('Invalid id.')]})
+                continue
+            if pk not in found:
+                errors.append({'id': [_('Object with id %s not found.') % pk]})
+            elif pk in seen:
+                errors.append({'id': [_('Duplicate id %s.') % pk]})
+            else:
+                errors.append({})
+            seen.add(pk)
+        if any(errors):
+            raise ValidationError(errors)
+
+        return [found[pk] for pk in ids]
+
+    def _bulk_response(self, instances, response_status):
+        """Serialize instances, prefetching their relations at once"""
+        model = self.get_queryset().model
+        names = [field.name for field in model._meta.many_to_many]
+        objs = model.objects.prefetch_related(*names).in_bulk([
+            instance.pk for instance in instances
+        ])
+        serializer = self.get_serializer(
+            [objs[instance.pk] for instance in instances],
+            many=True
+        )
+
+        return Response(serializer.data, status=response_status)
+
+    @action(methods=['POST', 'PATCH', 'DELETE'], detail=False, url_path='bulk')
+    def bulk(self, request):
+        """Create, update or delete many objects at once"""
+        if request.method == 'DELETE':
+            return self.bulk_destroy(request)
+
+        self._check_items(request.data)
+        if request.method == 'POST':
+            serializer = self.get_serializer(data=request.data, many=True)
+            save_kwargs = {'user': request.user}
+            response_status = status.HTTP_201_CREATED
+        else:
+            instances = self._get_instances([
+                item.get('id') if isinstance(item, dict) else None
+                for item in request.data
+            ])
+            serializer = self.get_serializer(
+                instances,
+                data=request.data,
+                many=True,
+                partial=True
+            )
+            save_kwargs = {}
+            response_status = status.HTTP_200_OK
+
+        serializer.is_valid(raise_exception=True)
+        with transaction.atomic():
+            instances = serializer.save(**save_kwargs)
+            refresh_search(
+                self.get_queryset().model,
+                [instance.pk for instance in instances]
+            )
+            invalidate_responses(request.user.pk)
+
+        return self._bulk_response(instances, response_status)
+
+    def bulk_destroy(self, request):
+        """Delete the user's objects whose ids are given"""
+        ids = request.data.get('ids') if isinstance(request.data, dict) \
+            else None
+        self._check_items(ids)
+        instances = self._get_instances(ids)
+        with transaction.atomic():
+            self.get_queryset().filter(
+                pk__in=[instance.pk for instance in instances]
+            ).delete()
+
+        return Response(status=status.HTTP_204_NO_CONTENT)
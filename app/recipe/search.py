@@ -0,0 +1,211 @@
+import re
+import threading
+from collections import defaultdict
+
+from django.contrib.postgres.search import SearchQuery, SearchRank, \
+    SearchVector
+from django.db import connections, router
+from django.db.models import Case, F, FloatField, OuterRef, Subquery, \
+    TextField, Value, When
+from django.db.models.functions import Coalesce
+
+from core.models import Tag, Ingredient, Recipe
+
+
+SEARCH_CONFIG = 'english'
+
+# the weights PostgreSQL ranks the A, B and C labels with by default
+SOURCES = (
+    ('title', 'A', 1.0),
+    ('tags', 'B', 0.4),
+    ('ingredients', 'C', 0.2),
+)
+
+TOKEN_RE = re.compile(r'\w+')
+
+
+def uses_postgres():
+    """Return whether recipes live in a PostgreSQL database"""
+    return connections[router.db_for_read(Recipe)].vendor == 'postgresql'
+
+
+def tokenize(text):
+    """Return the lower case words of text"""
+    return TOKEN_RE.findall(text.lower())
+
+
+def _names(model):
+    """Return the space separated names of a recipe's tags or ingredients"""
+    from django.contrib.postgres.aggregates import StringAgg
+
+    names = model.objects.filter(
+        recipe=OuterRef('pk')
+    ).order_by().values('recipe').annotate(
+        names=StringAgg('name', ' ')
+    ).values('names')
+
+    return Coalesce(Subquery(names, output_field=TextField()), Value(''))
+
+
+class InvertedIndex:
+    """In process token -> recipe index for databases without full text
+
+    It is built from the database on the first search and then kept up
+    to date through update() and remove(). Tokens are plain lower case
+    words, without the stemming and stop words of PostgreSQL.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.ready = False
+        self.postings = defaultdict(dict)
+        self.documents = {}
+
+    def _documents(self, pks=None):
+        """Return recipe pk -> (user pk, token -> weight) from the database"""
+        recipes = Recipe.objects.all()
+        if pks is not None:
+            recipes = recipes.filter(pk__in=pks)
+        texts = defaultdict(lambda: defaultdict(list))
+        users = {}
+        for pk, user_pk, title in recipes.values_list('pk', 'user', 'title'):
+            users[pk] = user_pk
+            texts[pk]['title'].append(title)
+        for field in ('tags', 'ingredients'):
+            through = Recipe._meta.get_field(field).remote_field.through
+            target = Recipe._meta.get_field(field).m2m_reverse_field_name()
+            links = through.objects.filter(recipe_id__in=list(users))
+            for pk, name in links.values_list('recipe_id', f'{target}__name'):
+                texts[pk][field].append(name)
+
+        documents = {}
+        for pk, user_pk in users.items():
+            weights = {}
+            for field, _, weight in SOURCES:
+                for token in set(tokenize(' '.join(texts[pk][field]))):
+                    weights[token] = weights.get(token, 0) + weight
+            documents[pk] = (user_pk, weights)
+
+        return documents
+
+    def _remove(self, pk):
+        _, weights = self.documents.pop(pk, (None, {}))
+        for token in weights:
+            self.postings[token].pop(pk, None)
+            if not self.postings[token]:
+                del self.postings[token]
+
+    def _add(self, pk, document):
+        self.documents[pk] = document
+        for token, weight in document[1].items():
+            self.postings[token][pk] = weight
+
+    def build(self):
+        """Index every recipe of the database"""
+        documents = self._documents()
+        with self.lock:
+            self.postings.clear()
+            self.documents.clear()
+            for pk, document in documents.items():
+                self._add(pk, document)
+            self.ready = True
+
+    def clear(self):
+        """Empty the index, it is rebuilt on the next search"""
+        with self.lock:
+            self.postings.clear()
+            self.documents.clear()
+            self.ready = False
+
+    def update(self, pks):
+        """Reindex the recipes with pks"""
+        if not self.ready:
+            return
+        documents = self._documents(pks)
+        with self.lock:
+            for pk in pks:
+                self._remove(pk)
+                if pk in documents:
+                    self._add(pk, documents[pk])
+
+    def remove(self, pks):
+        """Drop the recipes with pks from the index"""
+        with self.lock:
+            for pk in pks:
+                self._remove(pk)
+
+    def search(self, terms, user_pk=None):
+        """Return pk -> score of the recipes matching every word of terms"""
+        if not self.ready:
+            self.build()
+        tokens = set(tokenize(terms))
+        if not tokens:
+            return {}
+
+        with self.lock:
+            postings = sorted(
+                (self.postings.get(token, {}) for token in tokens),
+                key=len
+            )
+            return {
+                pk: sum(posting[pk] for posting in postings)
+                for pk in postings[0]
+                if all(pk in posting for posting in postings[1:]) and
+                (user_pk is None or self.documents[pk][0] == user_pk)
+            }
+
+
+recipe_index = InvertedIndex()
+
+
+def search_enabled():
+    """Return whether recipe changes need to update search data"""
+    return recipe_index.ready or uses_postgres()
+
+
+def update_search(recipes):
+    """Recompute the search data of the recipes of a queryset"""
+    if uses_postgres():
+        vector = SearchVector('title', weight='A', config=SEARCH_CONFIG)
+        for model, weight in ((Tag, 'B'), (Ingredient, 'C')):
+            vector = vector + SearchVector(
+                _names(model),
+                weight=weight,
+                config=SEARCH_CONFIG
+            )
+        recipes.update(search_vector=vector)
+    elif recipe_index.ready:
+        recipe_index.update(list(recipes.values_list('pk', flat=True)))
+
+
+def remove_from_search(pks):
+    """Forget deleted recipes"""
+    if not uses_postgres():
+        recipe_index.remove(pks)
+
+
+def refresh_search(model, pks):
+    """Recompute the search data affected by a change to objects of model"""
+    if model is Recipe:
+        update_search(Recipe.objects.filter(pk__in=pks))
+    elif model in (Tag, Ingredient):
+        field = 'tags' if model is Tag else 'ingredients'
+        update_search(Recipe.objects.filter(**{f'{field}__in': pks}))
+
+
+def search_recipes(queryset, terms, user_pk=None):
+    """Filter queryset on terms, annotating matches with search_rank"""
+    if uses_postgres():
+        query = SearchQuery(terms, config=SEARCH_CONFIG)
+        return queryset.filter(search_vector=query).annotate(
+            search_rank=SearchRank(F('search_vector'), query)
+        )
+
+    scores = recipe_index.search(terms, user_pk)
+    return queryset.filter(pk__in=list(scores)).annotate(
+        search_rank=Case(
+            *[When(pk=pk, then=Value(score)) for pk, score in scores.items()],
+            default=Value(0.0),
+            output_field=FloatField()
+        )
+    )
@@ -1,33 +1,158 @@
+from django.conf import settings
+from django.utils import timezone
+
 from rest_framework import serializers
 
+from core.bulk import bulk_create, bulk_link, bulk_unlink, touch_linked
+from core.metrics import TimedSerializerMixin
 from core.models import Tag, Ingredient, Recipe
 
+from .fields import BatchedManyRelatedField, UserPrimaryKeyRelatedField
+from .uploads import check_image_header
+
+
+class BulkListSerializer(TimedSerializerMixin, serializers.ListSerializer):
+    """Create or update many objects with batched queries"""
+
+    def to_internal_value(self, data):
+        """Validate every item, resolving related primary keys up front"""
+        if isinstance(data, list):
+            self._prefetch_related_objects(data)
+
+        return super().to_internal_value(data)
+
+    def _prefetch_related_objects(self, data):
+        """Resolve the related primary keys of all items in one query each"""
+        related_objects = self.context.setdefault('related_objects', {})
+        for name, field in self.child.fields.items():
+            if field.read_only or not isinstance(
+                field,
+                BatchedManyRelatedField
+            ):
+                continue
+            pks = set()
+            for item in data:
+                try:
+                    pks.update(field.to_pks(item[name]))
+                except (KeyError, TypeError, serializers.ValidationError):
+                    continue
+            related_objects[name] = \
+                field.child_relation.get_queryset().in_bulk(pks)
+
+    def _pop_relations(self, validated_data):
+        """Remove and return the many to many values of every item"""
+        names = [
+            field.name
+            for field in self.child.Meta.model._meta.many_to_many
+        ]
+
+        return [
+            {name: attrs.pop(name) for name in names if name in attrs}
+            for attrs in validated_data
+        ]
+
+    def _link(self, instances, relations, replace=False):
+        """Write the many to many links of instances in batches"""
+        model = self.child.Meta.model
+        for field in model._meta.many_to_many:
+            changed = [
+                (instance, related[field.name])
+                for instance, related in zip(instances, relations)
+                if field.name in related
+            ]
+            if not changed:
+                continue
+            if replace:
+                bulk_unlink(model, field.name, [
+                    instance.pk for instance, _ in changed
+                ])
+            bulk_link(model, field.name, [
+                (instance.pk, obj.pk)
+                for instance, objs in changed
+                for obj in objs
+            ])
+
+    def create(self, validated_data):
+        """Insert every item with bulk_create"""
+        model = self.child.Meta.model
+        relations = self._pop_relations(validated_data)
+        instances = bulk_create(
+            model,
+            [model(**attrs) for attrs in validated_data]
+        )
+        self._link(instances, relations)
+        touch_linked(model, [instance.pk for instance in instances])
+
+        return instances
+
+    def update(self, instances, validated_data):
+        """Update every item with bulk_update"""
+        model = self.child.Meta.model
+        relations = self._pop_relations(validated_data)
+        fields = {'modified'}
+        now = timezone.now()
+        for instance, attrs in zip(instances, validated_data):
+            for attr, value in attrs.items():
+                setattr(instance, attr, value)
+            instance.modified = now
+            fields.update(attrs)
+
+        pks = [instance.pk for instance in instances]
+        model.objects.bulk_update(
+            instances,
+            fields,
+            batch_size=settings.BULK_BATCH_SIZE
+        )
+        touch_linked(model, pks)
+        self._link(instances, relations, replace=True)
+        touch_linked(model, pks)
 
-class TagSerializer(serializers.ModelSerializer):
+        return instances
+
+
+class TagSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     """Serializer Tag objects"""
 
     class Meta:
         model = Tag
         fields = 'id', 'name'
         read_only_fields = 'id',
+        list_serializer_class = BulkListSerializer
 
 
-class IngredientSerializer(serializers.ModelSerializer):
+class IngredientSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     """Serializer Ingredients objects"""
 
     class Meta:
         model = Ingredient
         fields = 'id', 'name'
         read_only_fields = 'id',
+        list_serializer_class = BulkListSerializer
+
+
+class TagCountSerializer(TagSerializer):
+    """Serialize Tag objects with the number of recipes using them"""
+    recipe_count = serializers.IntegerField(read_only=True)
+
+    class Meta(TagSerializer.Meta):
+        fields = 'id', 'name', 'recipe_count'
+
+
+class IngredientCountSerializer(IngredientSerializer):
+    """Serialize Ingredient objects with the number of recipes using them"""
+    recipe_count = serializers.IntegerField(read_only=True)
 
+    class Meta(IngredientSerializer.Meta):
+        fields = 'id', 'name', 'recipe_count'
 
-class RecipeSerializer(serializers.ModelSerializer):
+
+class RecipeSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     """Serialize a recipe"""
-    ingredients = serializers.PrimaryKeyRelatedField(
+    ingredients = UserPrimaryKeyRelatedField(
         many=True,
         queryset=Ingredient.objects.all()
     )
-    tags = serializers.PrimaryKeyRelatedField(
+    tags = UserPrimaryKeyRelatedField(
         many=True,
         queryset=Tag.objects.all()
     )
@@ -39,6 +164,7 @@ class RecipeSerializer(serializers.ModelSerializer):
             'price', 'link'
         )
         read_only_fields = ('id',)
+        list_serializer_class = BulkListSerializer
 
 
 class RecipeDetailSerializer(RecipeSerializer):
@@ -47,10 +173,22 @@ class RecipeDetailSerializer(RecipeSerializer):
     tags = TagSerializer(many=True, read_only=True)
 
 
-class RecipeImageSerializer(serializers.ModelSerializer):
+class RecipeImageSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     """Serializer for uploading images to recipes"""
 
     class Meta:
         model = Recipe
-        fields = ('id', 'image')
-        read_only_fields = ('id',)
+        fields = (
+            'id', 'image', 'image_status', 'image_thumbnail', 'image_medium'
+        )
+        read_only_fields = (
+            'id', 'image_status', 'image_thumbnail', 'image_medium'
+        )
+
+    def validate_image(self, value):
+        """Check the image format and dimensions from its header"""
+        if value is not None:
+            check_image_header(value)
+            value.seek(0)
+
+        return value
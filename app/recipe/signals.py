@@ -0,0 +1,65 @@
+from django.db.models.signals import m2m_changed, post_delete, post_save, \
+    pre_delete
+from django.dispatch import receiver
+
+from core.models import Tag, Ingredient, Recipe
+
+from .search import refresh_search, remove_from_search, search_enabled, \
+    update_search
+
+
+@receiver(post_save, sender=Recipe)
+def index_recipe(sender, instance, **kwargs):
+    """Recompute the search data of a saved recipe"""
+    refresh_search(Recipe, [instance.pk])
+
+
+@receiver(post_delete, sender=Recipe)
+def unindex_recipe(sender, instance, **kwargs):
+    """Remove a deleted recipe from the search data"""
+    remove_from_search([instance.pk])
+
+
+@receiver(m2m_changed, sender=Recipe.tags.through)
+@receiver(m2m_changed, sender=Recipe.ingredients.through)
+def index_relinked_recipes(sender, instance, action, reverse, pk_set,
+                           **kwargs):
+    """Recompute the search data of recipes whose names changed"""
+    if not reverse:
+        if action in ('post_add', 'post_remove', 'post_clear'):
+            refresh_search(Recipe, [instance.pk])
+    elif action == 'pre_clear' and search_enabled():
+        instance._search_recipe_pks = list(
+            instance.recipe_set.values_list('pk', flat=True)
+        )
+    elif action == 'post_clear':
+        refresh_search(Recipe, getattr(instance, '_search_recipe_pks', []))
+    elif action in ('post_add', 'post_remove'):
+        refresh_search(Recipe, pk_set)
+
+
+@receiver(post_save, sender=Tag)
+@receiver(post_save, sender=Ingredient)
+def index_renamed(sender, instance, created, **kwargs):
+    """Recompute the search data of the recipes using a renamed object"""
+    if not created:
+        refresh_search(sender, [instance.pk])
+
+
+@receiver(pre_delete, sender=Tag)
+@receiver(pre_delete, sender=Ingredient)
+def remember_unlinked(sender, instance, **kwargs):
+    """Note the recipes losing a deleted tag or ingredient"""
+    if search_enabled():
+        instance._search_recipe_pks = list(
+            instance.recipe_set.values_list('pk', flat=True)
+        )
+
+
+@receiver(post_delete, sender=Tag)
+@receiver(post_delete, sender=Ingredient)
+def index_unlinked(sender, instance, **kwargs):
+    """Recompute the search data of the recipes that lost an object"""
+    update_search(Recipe.objects.filter(
+        pk__in=getattr(instance, '_search_recipe_pks', [])
+    ))
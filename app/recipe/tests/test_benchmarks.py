@@ -0,0 +1,112 @@
+import json
+import tempfile
+from io import StringIO
+
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db import connection
+from django.test import TestCase
+
+from core.models import Recipe
+from recipe.benchmarks import compare_to_baseline
+
+
+class BenchmarkCommandTests(TestCase):
+
+    def run_benchmark(self, *args):
+        """Run the benchmark command on a tiny dataset and return output"""
+        out = StringIO()
+        call_command(
+            'benchmark', *args,
+            '--recipes', '20', '--tags', '5', '--ingredients', '5',
+            stdout=out
+        )
+        return out.getvalue()
+
+    def test_indexes_scenario(self):
+        """Test the indexes scenario prints plans and rolls back its data"""
+        output = self.run_benchmark('indexes', '--compare')
+
+        self.assertIn('== recipes by tag (with indexes)', output)
+        self.assertIn('== recipes by tag (without indexes)', output)
+        self.assertFalse(Recipe.objects.exists())
+
+    def test_indexes_scenario_restores_indexes(self):
+        """Test comparing without indexes never drops them for good"""
+        self.run_benchmark('indexes', '--compare', '--keep')
+
+        with connection.cursor() as cursor:
+            constraints = connection.introspection.get_constraints(
+                cursor,
+                Recipe._meta.db_table
+            )
+        self.assertIn('core_recipe_user_id_idx', constraints)
+
+    def test_assigned_only_scenario(self):
+        """Test the assigned_only scenario reports both timings"""
+        output = self.run_benchmark('assigned_only', '--compare')
+
+        self.assertIn('exists semi-join:', output)
+        self.assertIn('join:', output)
+
+    def test_serializers_scenario(self):
+        """Test the serializers scenario reports identical output"""
+        output = self.run_benchmark('serializers')
+
+        self.assertIn('RecipeSerializer fast:', output)
+        self.assertIn('RecipeSerializer identical output: True', output)
+        self.assertIn('RecipeDetailSerializer identical output: True', output)
+
+    def test_connections_scenario(self):
+        """Test the connections scenario times fresh and reused ones"""
+        output = self.run_benchmark('connections', '--iterations', '5')
+
+        self.assertIn('fresh: p50', output)
+        self.assertIn('persistent: p50', output)
+
+    def test_search_scenario(self):
+        """Test the search scenario times every query"""
+        output = self.run_benchmark('search')
+
+        self.assertIn('search data built', output)
+        self.assertIn("'tag 1':", output)
+
+    def test_hashers_scenario(self):
+        """Test the hashers scenario reports the cost of every policy"""
+        output = self.run_benchmark('hashers', '--iterations', '1')
+
+        self.assertIn('pbkdf2: ', output)
+        self.assertIn('argon2: ', output)
+        self.assertIn('bcrypt: ', output)
+
+    def test_api_scenario_baseline(self):
+        """Test the api scenario saves a baseline and fails on regressions"""
+        with tempfile.NamedTemporaryFile(suffix='.json') as ntf:
+            output = self.run_benchmark(
+                'api', '--iterations', '2',
+                '--baseline', ntf.name, '--save-baseline'
+            )
+            self.assertIn('token create: p50', output)
+            self.assertIn('upload image: p50', output)
+
+            with open(ntf.name) as baseline_file:
+                baseline = json.load(baseline_file)
+            baseline['list']['p50'] = 0.0001
+            with open(ntf.name, 'w') as baseline_file:
+                json.dump(baseline, baseline_file)
+
+            with self.assertRaisesMessage(CommandError, 'list: p50'):
+                self.run_benchmark(
+                    'api', '--iterations', '2', '--baseline', ntf.name
+                )
+
+    def test_compare_to_baseline(self):
+        """Test only operations slower than the tolerance are reported"""
+        regressions = compare_to_baseline(
+            {'list': {'p50': 12.0}, 'detail': {'p50': 20.0}},
+            {'list': {'p50': 10.0}, 'detail': {'p50': 10.0}},
+            0.25
+        )
+
+        self.assertEqual(len(regressions), 1)
+        self.assertTrue(regressions[0].startswith('detail:'))
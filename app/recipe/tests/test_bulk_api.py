@@ -0,0 +1,225 @@
+from django.contrib.auth import get_user_model
+from django.urls import reverse
+from django.test import TestCase
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import Recipe, Tag
+
+from recipe.serializers import RecipeSerializer
+
+
+RECIPE_BULK_URL = reverse('recipe:recipe-bulk')
+TAG_BULK_URL = reverse('recipe:tag-bulk')
+
+
+def sample_recipe(user, **params):
+    """Create and return a sample recipe"""
+    defaults = {
+        'title': 'Sample recipe',
+        'time_minutes': 10,
+        'price': 5.00
+    }
+    defaults.update(params)
+
+    return Recipe.objects.create(user=user, **defaults)
+
+
+class BulkApiTests(TestCase):
+    """Test the bulk create, update and delete endpoints"""
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            'test@test.com',
+            'testtest'
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_bulk_create_recipes(self):
+        """Test creating many recipes with tags in one request"""
+        tag1 = Tag.objects.create(user=self.user, name='vegan')
+        tag2 = Tag.objects.create(user=self.user, name='dessert')
+        payload = [
+            {
+                'title': f'recipe {i}',
+                'time_minutes': 10,
+                'price': '5.00',
+                'tags': [tag1.id, tag2.id],
+                'ingredients': [],
+            }
+            for i in range(3)
+        ]
+
+        res = self.client.post(RECIPE_BULK_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(len(res.data), 3)
+        self.assertEqual(
+            [recipe['title'] for recipe in res.data],
+            ['recipe 0', 'recipe 1', 'recipe 2']
+        )
+        for recipe in Recipe.objects.filter(user=self.user):
+            self.assertEqual(
+                set(recipe.tags.values_list('id', flat=True)),
+                {tag1.id, tag2.id}
+            )
+
+    def test_bulk_create_repeated_related_ids(self):
+        """Test repeated related ids of an item are linked once"""
+        tag = Tag.objects.create(user=self.user, name='vegan')
+        payload = [{
+            'title': 'recipe',
+            'time_minutes': 10,
+            'price': '5.00',
+            'tags': [tag.id, tag.id],
+            'ingredients': [],
+        }]
+
+        res = self.client.post(RECIPE_BULK_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        recipe = Recipe.objects.get(user=self.user)
+        self.assertEqual(
+            list(recipe.tags.values_list('id', flat=True)),
+            [tag.id]
+        )
+
+    def test_bulk_create_resolves_related_ids_once(self):
+        """Test related ids of all items are resolved in one query"""
+        tags = [
+            Tag.objects.create(user=self.user, name=f'tag {i}')
+            for i in range(5)
+        ]
+        payload = [
+            {
+                'title': f'recipe {i}',
+                'time_minutes': 10,
+                'price': '5.00',
+                'tags': [tag.id for tag in tags],
+                'ingredients': [],
+            }
+            for i in range(20)
+        ]
+        serializer = RecipeSerializer(data=payload, many=True)
+
+        with self.assertNumQueries(1):
+            self.assertTrue(serializer.is_valid())
+
+    def test_bulk_create_reports_errors_per_item(self):
+        """Test invalid items are reported by index and nothing is saved"""
+        item = {
+            'title': 'valid',
+            'time_minutes': 10,
+            'price': '5.00',
+            'tags': [],
+            'ingredients': [],
+        }
+        payload = [item, dict(item, title='')]
+
+        res = self.client.post(RECIPE_BULK_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(res.data[0], {})
+        self.assertIn('title', res.data[1])
+        self.assertFalse(Recipe.objects.exists())
+
+    def test_bulk_update_recipes(self):
+        """Test partially updating many recipes in one request"""
+        recipe1 = sample_recipe(user=self.user, title='pasta')
+        recipe2 = sample_recipe(user=self.user, title='salade')
+        old_tag = Tag.objects.create(user=self.user, name='old')
+        new_tag = Tag.objects.create(user=self.user, name='new')
+        recipe1.tags.add(old_tag)
+        payload = [
+            {'id': recipe1.id, 'tags': [new_tag.id]},
+            {'id': recipe2.id, 'title': 'soup'},
+        ]
+
+        res = self.client.patch(RECIPE_BULK_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        recipe1.refresh_from_db()
+        recipe2.refresh_from_db()
+        self.assertEqual(recipe1.title, 'pasta')
+        self.assertEqual(list(recipe1.tags.all()), [new_tag])
+        self.assertEqual(recipe2.title, 'soup')
+
+    def test_bulk_update_other_users_recipe(self):
+        """Test recipes of other users cannot be bulk updated"""
+        user2 = get_user_model().objects.create_user(
+            'user2@test.com',
+            'testtest'
+        )
+        recipe = sample_recipe(user=user2, title='pasta')
+
+        res = self.client.patch(
+            RECIPE_BULK_URL,
+            [{'id': recipe.id, 'title': 'stolen'}],
+            format='json'
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        recipe.refresh_from_db()
+        self.assertEqual(recipe.title, 'pasta')
+
+    def test_bulk_invalid_ids(self):
+        """Test ids that are not integers are reported per item"""
+        recipe = sample_recipe(user=self.user)
+
+        res = self.client.patch(RECIPE_BULK_URL, [
+            {'id': [recipe.id]}, {'id': True}, {'id': recipe.id}
+        ], format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(res.data[0], {'id': ['Invalid id.']})
+        self.assertEqual(res.data[1], {'id': ['Invalid id.']})
+        self.assertEqual(res.data[2], {})
+
+        res = self.client.delete(
+            RECIPE_BULK_URL,
+            {'ids': [{'a': 1}, recipe.id]},
+            format='json'
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(res.data[0], {'id': ['Invalid id.']})
+        self.assertTrue(Recipe.objects.filter(pk=recipe.pk).exists())
+
+    def test_bulk_delete_recipes(self):
+        """Test deleting many recipes in one request"""
+        recipe1 = sample_recipe(user=self.user)
+        recipe2 = sample_recipe(user=self.user)
+        recipe3 = sample_recipe(user=self.user)
+
+        res = self.client.delete(
+            RECIPE_BULK_URL,
+            {'ids': [recipe1.id, recipe2.id]},
+            format='json'
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_204_NO_CONTENT)
+        self.assertEqual(list(Recipe.objects.all()), [recipe3])
+
+    def test_bulk_create_tags(self):
+        """Test creating many tags in one request"""
+        res = self.client.post(
+            TAG_BULK_URL,
+            [{'name': 'vegan'}, {'name': 'dessert'}],
+            format='json'
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(
+            set(Tag.objects.filter(
+                user=self.user
+            ).values_list('name', flat=True)),
+            {'vegan', 'dessert'}
+        )
+
+    def test_bulk_payload_must_be_list(self):
+        """Test a bulk payload that is not a list is rejected"""
+        res = self.client.post(TAG_BULK_URL, {'name': 'vegan'}, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
@@ -46,7 +46,7 @@ class AuthIngredientApiTest(TestCase):
         serializer = IngredientSerializer(ingredients, many=True)
 
         self.assertEqual(res.status_code, status.HTTP_200_OK)
-        self.assertEqual(res.data, serializer.data)
+        self.assertEqual(res.data['results'], serializer.data)
 
     def test_ingredient_limited_to_authenticated_user(self):
         """test that the ingredients are limited to the authenticated user"""
@@ -62,8 +62,8 @@ class AuthIngredientApiTest(TestCase):
 
         res = self.client.get(INGREDIENT_URL)
         self.assertEqual(res.status_code, status.HTTP_200_OK)
-        self.assertEqual(len(res.data), 1)
-        self.assertEqual(res.data[0]['name'], ingredient.name)
+        self.assertEqual(len(res.data['results']), 1)
+        self.assertEqual(res.data['results'][0]['name'], ingredient.name)
 
     def test_creating_ingredients_successful(self):
         """tests creating ingredients for the auth user"""
@@ -97,5 +97,27 @@ class AuthIngredientApiTest(TestCase):
         serializer1 = IngredientSerializer(ingredient1)
         serializer2 = IngredientSerializer(ingredient2)
 
-        self.assertIn(serializer1.data, res.data)
-        self.assertNotIn(serializer2.data, res.data)
+        self.assertIn(serializer1.data, res.data['results'])
+        self.assertNotIn(serializer2.data, res.data['results'])
+
+    def test_retrieve_assigned_ingredients_unique(self):
+        """Test filtering ingredients by assigned returns unique items"""
+        ingredient = Ingredient.objects.create(user=self.user, name='eggs')
+        Ingredient.objects.create(user=self.user, name='cheese')
+        for title in ('Eggs benedict', 'Omelette'):
+            recipe = Recipe.objects.create(
+                title=title,
+                price=5,
+                time_minutes=10,
+                user=self.user
+            )
+            recipe.ingredients.add(ingredient)
+
+        res = self.client.get(
+            INGREDIENT_URL,
+            {'assigned_only': 1, 'with_counts': 1}
+        )
+
+        self.assertEqual(res.data['results'], [
+            {'id': ingredient.id, 'name': ingredient.name, 'recipe_count': 2},
+        ])
@@ -1,21 +1,32 @@
+import json
 import os
 import tempfile
+import time
+from io import BytesIO, StringIO
+from unittest.mock import patch
 
 from PIL import Image
 
 from django.contrib.auth import get_user_model
+from django.core.management import call_command
 from django.urls import reverse
-from django.test import TestCase
+from django.test import TestCase, override_settings
 
 from rest_framework import status
-from rest_framework.test import APIClient
+from rest_framework.test import APIClient, APIRequestFactory
 
+from core.cache import response_cache
 from core.models import Recipe, Ingredient, Tag
 
+from recipe.images import process_recipe_image
+from recipe.pagination import RecipeCursorPagination
+from recipe.search import recipe_index
 from recipe.serializers import RecipeSerializer, RecipeDetailSerializer
+from recipe.uploads import ChunkedUpload
 
 
 RECIPE_URL = reverse('recipe:recipe-list')
+EXPORT_URL = reverse('recipe:recipe-export')
 
 
 def image_upload_url(recipe_id):
@@ -23,6 +34,11 @@ def image_upload_url(recipe_id):
     return reverse('recipe:recipe-upload-image', args=[recipe_id])
 
 
+def image_chunk_url(recipe_id):
+    """Return URL for chunked recipe image upload"""
+    return reverse('recipe:recipe-upload-image-chunk', args=[recipe_id])
+
+
 def detail_url(recipe_id):
     """return recipe detail URL"""
     return reverse("recipe:recipe-detail", args=[recipe_id])
@@ -80,10 +96,10 @@ class AuthRecipeTests(TestCase):
 
         res = self.client.get(RECIPE_URL)
 
-        recipes = Recipe.objects.all()
+        recipes = Recipe.objects.all().order_by('-id')
         serializer = RecipeSerializer(recipes, many=True)
         self.assertEqual(res.status_code, status.HTTP_200_OK)
-        self.assertEqual(res.data, serializer.data)
+        self.assertEqual(res.data['results'], serializer.data)
 
     def test_recipes_limited_to_the_auth_user(self):
         """test that the recipes are only limited to the authenticated user"""
@@ -98,8 +114,33 @@ class AuthRecipeTests(TestCase):
         res = self.client.get(RECIPE_URL)
 
         self.assertEqual(res.status_code, status.HTTP_200_OK)
-        self.assertEqual(len(res.data), 1)
-        self.assertEqual(res.data[0]['title'], serializer.data[0]['title'])
+        self.assertEqual(len(res.data['results']), 1)
+        self.assertEqual(
+            res.data['results'][0]['title'],
+            serializer.data[0]['title']
+        )
+
+    def test_retrieve_recipes_paginated(self):
+        """Test recipes are paginated with a capped page size"""
+        for i in range(5):
+            sample_recipe(user=self.user, title=f'recipe {i}')
+
+        res = self.client.get(RECIPE_URL, {'page_size': 2})
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            [recipe['title'] for recipe in res.data['results']],
+            ['recipe 4', 'recipe 3']
+        )
+
+        res = self.client.get(res.data['next'])
+        self.assertEqual(
+            [recipe['title'] for recipe in res.data['results']],
+            ['recipe 2', 'recipe 1']
+        )
+
+        with patch.object(RecipeCursorPagination, 'max_page_size', 3):
+            res = self.client.get(RECIPE_URL, {'page_size': 10000})
+        self.assertEqual(len(res.data['results']), 3)
 
     def test_recipe_detail_view(self):
         """test viewing a recipe details"""
@@ -115,6 +156,154 @@ class AuthRecipeTests(TestCase):
 
         self.assertEqual(res.data, serializer.data)
 
+    def test_list_query_count_constant(self):
+        """test listing recipes runs the same number of queries for any size"""
+        def add_recipes(count):
+            for i in range(count):
+                recipe = sample_recipe(user=self.user, title=f'recipe {i}')
+                recipe.tags.add(sample_tag(user=self.user))
+                recipe.ingredients.add(sample_ingredient(user=self.user))
+
+        add_recipes(2)
+        with self.assertNumQueries(4):
+            self.client.get(RECIPE_URL)
+
+        add_recipes(10)
+        with self.assertNumQueries(4):
+            res = self.client.get(RECIPE_URL)
+
+        self.assertEqual(len(res.data['results']), 12)
+
+    def test_detail_query_count_constant(self):
+        """test retrieving a recipe runs the same number of queries"""
+        recipe = sample_recipe(user=self.user)
+        for i in range(10):
+            recipe.tags.add(sample_tag(user=self.user, name=f'tag {i}'))
+            recipe.ingredients.add(
+                sample_ingredient(user=self.user, name=f'ingredient {i}')
+            )
+
+        with self.assertNumQueries(4):
+            res = self.client.get(detail_url(recipe.id))
+
+        self.assertEqual(len(res.data['tags']), 10)
+        self.assertEqual(len(res.data['ingredients']), 10)
+
+    def test_list_not_modified(self):
+        """Test listing recipes honours If-None-Match"""
+        sample_recipe(user=self.user)
+        res = self.client.get(RECIPE_URL)
+        etag = res['ETag']
+
+        # bypass the response cache to exercise the ETag query
+        with patch.object(response_cache, 'get', return_value=None), \
+                self.assertNumQueries(1):
+            res = self.client.get(RECIPE_URL, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(res.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(res['ETag'], etag)
+
+        res = self.client.get(
+            RECIPE_URL,
+            {'page_size': 1},
+            HTTP_IF_NONE_MATCH=etag
+        )
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+        sample_recipe(user=self.user)
+        res = self.client.get(RECIPE_URL, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(res['ETag'], etag)
+
+    def test_list_etag_changes_on_delete(self):
+        """Test deleting a recipe changes the list ETag"""
+        sample_recipe(user=self.user)
+        recipe = sample_recipe(user=self.user)
+        etag = self.client.get(RECIPE_URL)['ETag']
+
+        recipe.delete()
+        res = self.client.get(RECIPE_URL, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+    def test_detail_not_modified(self):
+        """Test retrieving a recipe honours If-None-Match"""
+        recipe = sample_recipe(user=self.user)
+        tag = sample_tag(user=self.user)
+        recipe.tags.add(tag)
+        url = detail_url(recipe.id)
+        res = self.client.get(url)
+        etag = res['ETag']
+        self.assertIn('Last-Modified', res)
+
+        with self.assertNumQueries(1):
+            res = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(res.status_code, status.HTTP_304_NOT_MODIFIED)
+
+        tag.name = 'renamed'
+        tag.save()
+        res = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['tags'][0]['name'], 'renamed')
+
+    def test_detail_etag_changes_on_new_tag(self):
+        """Test linking a tag to a recipe changes its ETag"""
+        recipe = sample_recipe(user=self.user)
+        url = detail_url(recipe.id)
+        etag = self.client.get(url)['ETag']
+
+        recipe.tags.add(sample_tag(user=self.user))
+        res = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+    def test_list_served_from_cache(self):
+        """Test repeated list requests are served without queries"""
+        sample_recipe(user=self.user, title='pasta')
+        res = self.client.get(RECIPE_URL)
+
+        with self.assertNumQueries(0):
+            cached = self.client.get(RECIPE_URL)
+        self.assertEqual(cached.status_code, status.HTTP_200_OK)
+        self.assertEqual(cached.content, res.content)
+        self.assertEqual(cached['ETag'], res['ETag'])
+
+        with self.assertNumQueries(0):
+            res = self.client.get(RECIPE_URL, HTTP_IF_NONE_MATCH=res['ETag'])
+        self.assertEqual(res.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    def test_list_cache_invalidated_on_change(self):
+        """Test cached lists are invalidated when recipes change"""
+        recipe = sample_recipe(user=self.user, title='pasta')
+        self.client.get(RECIPE_URL)
+
+        recipe.title = 'salade'
+        recipe.save()
+        res = self.client.get(RECIPE_URL)
+        self.assertEqual(res.data['results'][0]['title'], 'salade')
+
+        tag = sample_tag(user=self.user)
+        recipe.tags.add(tag)
+        res = self.client.get(RECIPE_URL)
+        self.assertEqual(res.data['results'][0]['tags'], [tag.id])
+
+        tag.delete()
+        res = self.client.get(RECIPE_URL)
+        self.assertEqual(res.data['results'][0]['tags'], [])
+
+    def test_list_cache_limited_to_user(self):
+        """Test cached lists are never served to another user"""
+        sample_recipe(user=self.user)
+        self.client.get(RECIPE_URL)
+        user2 = get_user_model().objects.create_user(
+            'user2@test.com',
+            'testtest'
+        )
+        self.client.force_authenticate(user2)
+
+        res = self.client.get(RECIPE_URL)
+
+        self.assertEqual(res.data['results'], [])
+
     def test_create_basic_recipe(self):
         """Test creating a basic recipe"""
         payload = {
@@ -167,6 +356,73 @@ class AuthRecipeTests(TestCase):
         self.assertIn(ingredient1, ingredients)
         self.assertIn(ingredient2, ingredients)
 
+    def test_create_recipe_with_other_users_tag(self):
+        """Test recipes cannot reference tags of other users"""
+        user2 = get_user_model().objects.create_user(
+            'user2@test.com',
+            'testtest'
+        )
+        tag = sample_tag(user=user2)
+        payload = {
+            'title': 'tasty',
+            'tags': [tag.id],
+            'time_minutes': 12,
+            'price': 5
+        }
+
+        res = self.client.post(RECIPE_URL, payload)
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('tags', res.data)
+
+    def test_recipe_repeated_related_ids(self):
+        """Test repeated related ids resolve to distinct objects"""
+        tag1 = sample_tag(user=self.user, name='vegan')
+        tag2 = sample_tag(user=self.user, name='dessert')
+        request = APIRequestFactory().post(RECIPE_URL)
+        request.user = self.user
+        serializer = RecipeSerializer(
+            data={
+                'title': 'tasty',
+                'tags': [tag2.id, tag1.id, tag2.id],
+                'ingredients': [],
+                'time_minutes': 12,
+                'price': 5
+            },
+            context={'request': request}
+        )
+
+        self.assertTrue(serializer.is_valid())
+        self.assertEqual(serializer.validated_data['tags'], [tag2, tag1])
+
+    def test_recipe_related_ids_validated_in_one_query(self):
+        """Test all related ids are resolved with one query per field"""
+        tags = [sample_tag(user=self.user, name=f'tag {i}') for i in range(5)]
+        ingredients = [
+            sample_ingredient(user=self.user, name=f'ingredient {i}')
+            for i in range(5)
+        ]
+        request = APIRequestFactory().post(RECIPE_URL)
+        request.user = self.user
+        serializer = RecipeSerializer(
+            data={
+                'title': 'tasty',
+                'tags': [tag.id for tag in tags] + [0, -1],
+                'ingredients': [ingredient.id for ingredient in ingredients],
+                'time_minutes': 12,
+                'price': 5
+            },
+            context={'request': request}
+        )
+
+        with self.assertNumQueries(2):
+            self.assertFalse(serializer.is_valid())
+
+        self.assertEqual(
+            serializer.errors['tags'],
+            ['Invalid pk(s) "0, -1" - object(s) do not exist.']
+        )
+
     def test_partial_update_recipe(self):
         """testing a partial update for the recipe"""
         recipe = sample_recipe(user=self.user)
@@ -214,6 +470,101 @@ class AuthRecipeTests(TestCase):
         self.assertEqual(ingredients.count(), 1)
         self.assertIn(new_ingredient, ingredients)
 
+    def _fast_recipes(self):
+        """Create recipes with several tags, ingredients and empty fields"""
+        tags = [sample_tag(self.user, name=f'tag {i}') for i in range(3)]
+        ingredients = [
+            sample_ingredient(self.user, name=f'ingredient {i}')
+            for i in range(3)
+        ]
+        recipe = sample_recipe(self.user, price=7.5, link='http://x.io')
+        recipe.tags.add(*reversed(tags))
+        recipe.ingredients.add(*ingredients[:2])
+        sample_recipe(self.user, title='no relations')
+
+        return recipe
+
+    @patch('recipe.mixins.response_cache.get', return_value=None)
+    def test_fast_serialization_list_identical(self, cache_get):
+        """Test the fast list output is byte identical to the serializer"""
+        self._fast_recipes()
+
+        res = self.client.get(RECIPE_URL)
+        with override_settings(RECIPE_FAST_SERIALIZATION=True):
+            with self.assertNumQueries(4):
+                fast_res = self.client.get(RECIPE_URL)
+
+        self.assertEqual(fast_res.status_code, status.HTTP_200_OK)
+        self.assertEqual(fast_res.content, res.content)
+
+    def test_fast_serialization_detail_identical(self):
+        """Test the fast detail output is byte identical to the serializer"""
+        recipe = self._fast_recipes()
+
+        res = self.client.get(detail_url(recipe.id))
+        with override_settings(RECIPE_FAST_SERIALIZATION=True):
+            fast_res = self.client.get(detail_url(recipe.id))
+
+        self.assertEqual(fast_res.status_code, status.HTTP_200_OK)
+        self.assertEqual(fast_res.content, res.content)
+        self.assertEqual(
+            [tag['name'] for tag in fast_res.data['tags']],
+            ['tag 0', 'tag 1', 'tag 2']
+        )
+
+    @override_settings(RECIPE_FAST_SERIALIZATION=True)
+    def test_fast_serialization_detail_other_user(self):
+        """Test the fast detail path does not leak other users' recipes"""
+        other = get_user_model().objects.create_user('o@test.com', 'pass12')
+        recipe = sample_recipe(other)
+
+        res = self.client.get(detail_url(recipe.id))
+
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_export_json(self):
+        """Test exporting streams every recipe of the user as JSON"""
+        recipe = self._fast_recipes()
+        other = get_user_model().objects.create_user('o@test.com', 'pass12')
+        sample_recipe(other)
+        recipes = Recipe.objects.filter(user=self.user).order_by('id')
+        serializer = RecipeDetailSerializer(recipes, many=True)
+
+        res = self.client.get(EXPORT_URL)
+        data = json.loads(b''.join(res.streaming_content))
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res['Content-Type'], 'application/json')
+        self.assertEqual(len(data), 2)
+        self.assertEqual(data[0]['id'], recipe.id)
+        self.assertEqual(
+            [item['id'] for item in data],
+            [item['id'] for item in serializer.data]
+        )
+        self.assertEqual(data[0]['tags'], serializer.data[0]['tags'])
+
+    @override_settings(RECIPE_EXPORT_CHUNK_SIZE=1)
+    def test_export_ndjson_in_chunks(self):
+        """Test NDJSON export fetches relations one chunk at a time"""
+        self._fast_recipes()
+        sample_recipe(self.user, title='third')
+
+        res = self.client.get(EXPORT_URL, {'output': 'ndjson'})
+        with self.assertNumQueries(7):
+            lines = b''.join(res.streaming_content).splitlines()
+
+        self.assertEqual(res['Content-Type'], 'application/x-ndjson')
+        self.assertEqual(
+            [json.loads(line)['title'] for line in lines],
+            ['Sample recipe', 'no relations', 'third']
+        )
+
+    def test_export_invalid_output(self):
+        """Test an unknown export output returns a 400"""
+        res = self.client.get(EXPORT_URL, {'output': 'xml'})
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
 
 class RecipeImageUploadTest(TestCase):
 
@@ -227,7 +578,19 @@ class RecipeImageUploadTest(TestCase):
         self.recipe = sample_recipe(user=self.user)
 
     def tearDown(self):
+        self.recipe.refresh_from_db()
         self.recipe.image.delete()
+        self.recipe.image_thumbnail.delete()
+        self.recipe.image_medium.delete()
+
+    def upload_image(self, size=(10, 10)):
+        """Upload a JPEG image of the given size to the sample recipe"""
+        url = image_upload_url(self.recipe.id)
+        with tempfile.NamedTemporaryFile(suffix='.jpg') as ntf:
+            img = Image.new('RGB', size)
+            img.save(ntf, format='JPEG')
+            ntf.seek(0)
+            return self.client.patch(url, {'image': ntf}, format='multipart')
 
     def test_upload_image_to_recipe(self):
         """Test uploading an image to recipe"""
@@ -243,6 +606,187 @@ class RecipeImageUploadTest(TestCase):
         self.assertIn('image', res.data)
         self.assertTrue(os.path.exists(self.recipe.image.path))
 
+    def test_upload_image_queues_processing(self):
+        """Test uploading an image queues the variants for processing"""
+        with patch('recipe.views.enqueue') as enqueue:
+            res = self.upload_image()
+
+        self.assertEqual(res.data['image_status'], Recipe.IMAGE_PENDING)
+        self.assertIsNone(res.data['image_thumbnail'])
+        enqueue.assert_called_once_with(process_recipe_image, self.recipe.id)
+
+    @override_settings(TASKS_ALWAYS_EAGER=True)
+    def test_upload_image_generates_variants(self):
+        """Test processing an uploaded image creates resized variants"""
+        self.upload_image(size=(1600, 1200))
+
+        res = self.client.get(image_upload_url(self.recipe.id))
+        self.recipe.refresh_from_db()
+
+        self.assertEqual(res.data['image_status'], Recipe.IMAGE_READY)
+        self.assertIn(
+            self.recipe.image_thumbnail.url,
+            res.data['image_thumbnail']
+        )
+        with Image.open(self.recipe.image_thumbnail.path) as thumbnail:
+            self.assertEqual(thumbnail.size, (200, 150))
+        with Image.open(self.recipe.image_medium.path) as medium:
+            self.assertEqual(medium.size, (800, 600))
+
+    def test_processed_image_invalidates_responses(self):
+        """Test processing an image changes the ETags and cached lists"""
+        with patch('recipe.views.enqueue'):
+            self.upload_image()
+        list_etag = self.client.get(RECIPE_URL)['ETag']
+        detail_url = reverse('recipe:recipe-detail', args=[self.recipe.id])
+        detail_etag = self.client.get(detail_url)['ETag']
+        generation = response_cache.generation(self.user.pk)
+
+        process_recipe_image(self.recipe.id)
+
+        self.assertNotEqual(self.client.get(RECIPE_URL)['ETag'], list_etag)
+        self.assertNotEqual(self.client.get(detail_url)['ETag'], detail_etag)
+        self.assertNotEqual(
+            response_cache.generation(self.user.pk),
+            generation
+        )
+
+    def test_process_images_command(self):
+        """Test stale pending images are processed by the sweep"""
+        with patch('recipe.views.enqueue'):
+            self.upload_image()
+        out = StringIO()
+
+        call_command('process_images', '--older-than', '0', stdout=out)
+
+        self.recipe.refresh_from_db()
+        self.assertEqual(self.recipe.image_status, Recipe.IMAGE_READY)
+        self.assertIn('processed 1 images', out.getvalue())
+
+    @override_settings(RECIPE_IMAGE_MAX_BYTES=100)
+    def test_upload_image_too_large(self):
+        """Test uploading an image over the byte limit is rejected"""
+        res = self.upload_image(size=(400, 400))
+
+        self.assertEqual(
+            res.status_code,
+            status.HTTP_413_REQUEST_ENTITY_TOO_LARGE
+        )
+
+    @override_settings(RECIPE_IMAGE_MAX_PIXELS=50)
+    def test_upload_image_too_many_pixels(self):
+        """Test uploading an image over the pixel limit is rejected"""
+        res = self.upload_image(size=(10, 10))
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def put_chunk(self, data, content_range, upload_id=None):
+        """PUT a chunk of a chunked image upload to the sample recipe"""
+        url = image_chunk_url(self.recipe.id)
+        if upload_id:
+            url += f'?upload_id={upload_id}'
+
+        return self.client.put(
+            url, data, content_type='application/octet-stream',
+            HTTP_CONTENT_RANGE=content_range
+        )
+
+    def test_upload_image_in_chunks(self):
+        """Test uploading an image in resumable chunks"""
+        buffer = BytesIO()
+        Image.new('RGB', (10, 10)).save(buffer, format='JPEG')
+        data = buffer.getvalue()
+        total = len(data)
+        half = total // 2
+        url = image_chunk_url(self.recipe.id)
+
+        res = self.put_chunk(data[:half], f'bytes 0-{half - 1}/{total}')
+        self.assertEqual(res.status_code, status.HTTP_202_ACCEPTED)
+        upload_id = res.data['upload_id']
+        self.assertEqual(
+            self.client.get(url, {'upload_id': upload_id}).data,
+            {'upload_id': upload_id, 'offset': half}
+        )
+
+        res = self.put_chunk(
+            data[1:half], f'bytes 1-{half - 1}/{total}', upload_id
+        )
+        self.assertEqual(res.status_code, status.HTTP_409_CONFLICT)
+
+        with patch('recipe.views.enqueue') as enqueue:
+            res = self.put_chunk(
+                data[half:], f'bytes {half}-{total - 1}/{total}', upload_id
+            )
+
+        self.recipe.refresh_from_db()
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['image_status'], Recipe.IMAGE_PENDING)
+        self.assertTrue(self.recipe.image.name.endswith('.jpg'))
+        with open(self.recipe.image.path, 'rb') as image_file:
+            self.assertEqual(image_file.read(), data)
+        enqueue.assert_called_once_with(process_recipe_image, self.recipe.id)
+        self.assertEqual(
+            self.client.get(url, {'upload_id': upload_id}).data['offset'],
+            0
+        )
+
+    def test_upload_image_chunks_of_separate_uploads(self):
+        """Test concurrent uploads to one recipe do not mix"""
+        first = self.put_chunk(b'aaaa', 'bytes 0-3/1000').data['upload_id']
+        second = self.put_chunk(b'bb', 'bytes 0-1/1000').data['upload_id']
+        self.addCleanup(ChunkedUpload(self.recipe, first).discard)
+        self.addCleanup(ChunkedUpload(self.recipe, second).discard)
+
+        self.assertNotEqual(first, second)
+        self.assertEqual(ChunkedUpload(self.recipe, first).offset, 4)
+        self.assertEqual(ChunkedUpload(self.recipe, second).offset, 2)
+
+    def test_upload_image_chunk_total_mismatch(self):
+        """Test later chunks must declare the total of the first one"""
+        upload_id = self.put_chunk(b'aaaa', 'bytes 0-3/1000').data['upload_id']
+        self.addCleanup(ChunkedUpload(self.recipe, upload_id).discard)
+
+        res = self.put_chunk(b'aaaa', 'bytes 4-7/2000', upload_id)
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(ChunkedUpload(self.recipe, upload_id).offset, 4)
+
+    def test_upload_image_chunk_without_body(self):
+        """Test a chunk without a body is rejected as short"""
+        res = self.put_chunk(b'', 'bytes 0-9/10')
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_upload_image_chunk_invalid_upload_id(self):
+        """Test upload ids cannot address arbitrary files"""
+        res = self.put_chunk(b'aaaa', 'bytes 0-3/1000', '../../etc')
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    @override_settings(RECIPE_UPLOAD_EXPIRY=60)
+    def test_expired_chunked_uploads_deleted(self):
+        """Test abandoned uploads are deleted when another one starts"""
+        upload_id = self.put_chunk(b'aaaa', 'bytes 0-3/1000').data['upload_id']
+        abandoned = ChunkedUpload(self.recipe, upload_id)
+        for path in (abandoned.path, abandoned.total_path):
+            os.utime(path, (time.time() - 120, time.time() - 120))
+
+        upload_id = self.put_chunk(b'bb', 'bytes 0-1/1000').data['upload_id']
+        self.addCleanup(ChunkedUpload(self.recipe, upload_id).discard)
+
+        self.assertFalse(os.path.exists(abandoned.path))
+        self.assertFalse(os.path.exists(abandoned.total_path))
+
+    def test_upload_image_chunk_not_an_image(self):
+        """Test a completed chunked upload that is not an image fails"""
+        res = self.client.put(
+            image_chunk_url(self.recipe.id), b'notimage',
+            content_type='application/octet-stream',
+            HTTP_CONTENT_RANGE='bytes 0-7/8'
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
     def test_upload_image_bad_request(self):
         """Test uploading an invalid image"""
         url = image_upload_url(self.recipe.id)
@@ -268,9 +812,9 @@ class RecipeImageUploadTest(TestCase):
         serializer1 = RecipeSerializer(recipe1)
         serializer2 = RecipeSerializer(recipe2)
         serializer3 = RecipeSerializer(recipe3)
-        self.assertIn(serializer1.data, res.data)
-        self.assertIn(serializer2.data, res.data)
-        self.assertNotIn(serializer3.data, res.data)
+        self.assertIn(serializer1.data, res.data['results'])
+        self.assertIn(serializer2.data, res.data['results'])
+        self.assertNotIn(serializer3.data, res.data['results'])
 
     def test_filter_recipes_by_ingredients(self):
         """test returning recipes with specific ingredients"""
@@ -290,6 +834,120 @@ class RecipeImageUploadTest(TestCase):
         serializer1 = RecipeSerializer(recipe1)
         serializer2 = RecipeSerializer(recipe2)
         serializer3 = RecipeSerializer(recipe3)
-        self.assertIn(serializer1.data, res.data)
-        self.assertIn(serializer2.data, res.data)
-        self.assertNotIn(serializer3.data, res.data)
+        self.assertIn(serializer1.data, res.data['results'])
+        self.assertIn(serializer2.data, res.data['results'])
+        self.assertNotIn(serializer3.data, res.data['results'])
+
+    def test_filter_recipes_returns_each_recipe_once(self):
+        """Test a recipe matching several filter ids is returned once"""
+        recipe = sample_recipe(user=self.user, title='pasta')
+        tag1 = sample_tag(user=self.user, name='tasty')
+        tag2 = sample_tag(user=self.user, name='vegan')
+        ingredient1 = sample_ingredient(user=self.user, name='tomato')
+        ingredient2 = sample_ingredient(user=self.user, name='basil')
+        recipe.tags.add(tag1, tag2)
+        recipe.ingredients.add(ingredient1, ingredient2)
+
+        res = self.client.get(RECIPE_URL, {
+            'tags': f'{tag1.id},{tag2.id}',
+            'ingredients': f'{ingredient1.id},{ingredient2.id}'
+        })
+
+        self.assertEqual(len(res.data['results']), 1)
+        self.assertEqual(res.data['results'][0]['id'], recipe.id)
+
+    def test_filter_recipes_match_all_tags(self):
+        """Test match=all only returns recipes having every tag"""
+        recipe1 = sample_recipe(user=self.user, title='pasta')
+        recipe2 = sample_recipe(user=self.user, title='salade')
+        tag1 = sample_tag(user=self.user, name='tasty')
+        tag2 = sample_tag(user=self.user, name='vegan')
+        recipe1.tags.add(tag1, tag2)
+        recipe2.tags.add(tag1)
+
+        res = self.client.get(
+            RECIPE_URL,
+            {'tags': f'{tag1.id},{tag2.id}', 'match': 'all'}
+        )
+
+        self.assertEqual(
+            [recipe['id'] for recipe in res.data['results']],
+            [recipe1.id]
+        )
+
+    def test_filter_recipes_invalid_params(self):
+        """Test invalid filter params return a bad request"""
+        res = self.client.get(RECIPE_URL, {'tags': 'one,two'})
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+        res = self.client.get(RECIPE_URL, {'tags': '1', 'match': 'some'})
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class RecipeSearchTests(TestCase):
+    """Test searching recipes with the q query param"""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            'test@test.com',
+            'testtest'
+        )
+        self.client.force_authenticate(self.user)
+        self.addCleanup(recipe_index.clear)
+
+        self.curry = sample_recipe(self.user, title='Chicken curry')
+        self.salad = sample_recipe(self.user, title='Green salad')
+        self.salad.ingredients.add(sample_ingredient(self.user, 'Chicken'))
+        self.soup = sample_recipe(self.user, title='Tomato soup')
+
+    def search(self, terms):
+        """Search recipes and return the ids of the results in order"""
+        res = self.client.get(RECIPE_URL, {'q': terms})
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+        return [recipe['id'] for recipe in res.data['results']]
+
+    def test_search_ranks_title_before_ingredients(self):
+        """Test title matches rank above ingredient matches"""
+        other = get_user_model().objects.create_user('o@test.com', 'pass12')
+        sample_recipe(other, title='Chicken wings')
+
+        self.assertEqual(
+            self.search('chicken'),
+            [self.curry.id, self.salad.id]
+        )
+
+    def test_search_matches_every_word(self):
+        """Test every word of the query must match"""
+        self.assertEqual(self.search('CHICKEN salad'), [self.salad.id])
+        self.assertEqual(self.search('chicken pizza'), [])
+
+    def test_search_updated_incrementally(self):
+        """Test the search data follows recipe, tag and ingredient changes"""
+        self.search('chicken')
+        tag = sample_tag(self.user, 'Vegetarian')
+        self.soup.tags.add(tag)
+        self.assertEqual(self.search('vegetarian'), [self.soup.id])
+
+        tag.name = 'Veggie'
+        tag.save()
+        self.assertEqual(self.search('vegetarian'), [])
+        self.assertEqual(self.search('veggie'), [self.soup.id])
+
+        self.soup.title = 'Pumpkin soup'
+        self.soup.save()
+        self.assertEqual(self.search('pumpkin'), [self.soup.id])
+
+        tag.delete()
+        self.assertEqual(self.search('veggie'), [])
+
+    @override_settings(RECIPE_FAST_SERIALIZATION=True)
+    def test_search_paginated_fast_path(self):
+        """Test ranked results page through the fast serialization path"""
+        res = self.client.get(RECIPE_URL, {'q': 'chicken', 'page_size': 1})
+        next_res = self.client.get(res.data['next'])
+
+        self.assertEqual(res.data['results'][0]['id'], self.curry.id)
+        self.assertEqual(next_res.data['results'][0]['id'], self.salad.id)
+        self.assertIsNone(next_res.data['next'])
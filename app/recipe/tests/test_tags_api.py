@@ -1,3 +1,6 @@
+from base64 import b64decode
+from urllib.parse import parse_qs, urlparse
+
 from django.contrib.auth import get_user_model
 from django.urls import reverse
 from django.test import TestCase
@@ -47,7 +50,7 @@ class AuthTagsApiTests(TestCase):
         tags = Tag.objects.all().order_by('-name')
         serializer = TagSerializer(tags, many=True)
         self.assertEqual(res.status_code, status.HTTP_200_OK)
-        self.assertEqual(res.data, serializer.data)
+        self.assertEqual(res.data['results'], serializer.data)
 
     def test_tags_limited_to_user(self):
         """Test that tags returned are for the authenticated user"""
@@ -60,8 +63,8 @@ class AuthTagsApiTests(TestCase):
 
         res = self.client.get(TAGS_URL)
         self.assertEqual(res.status_code, status.HTTP_200_OK)
-        self.assertEqual(len(res.data), 1)
-        self.assertEqual(res.data[0]['name'], tag.name)
+        self.assertEqual(len(res.data['results']), 1)
+        self.assertEqual(res.data['results'][0]['name'], tag.name)
 
     def test_create_tag_successful(self):
         """Test creating a new tag"""
@@ -96,5 +99,95 @@ class AuthTagsApiTests(TestCase):
         serializer1 = TagSerializer(tag1)
         serializer2 = TagSerializer(tag2)
 
-        self.assertIn(serializer1.data, res.data)
-        self.assertNotIn(serializer2.data, res.data)
+        self.assertIn(serializer1.data, res.data['results'])
+        self.assertNotIn(serializer2.data, res.data['results'])
+
+    def test_retrieve_assigned_tags_unique(self):
+        """Test filtering tags by assigned returns unique items"""
+        tag = Tag.objects.create(user=self.user, name='breakfast')
+        Tag.objects.create(user=self.user, name='lunch')
+        recipe1 = Recipe.objects.create(
+            title='Pancakes',
+            price=5,
+            time_minutes=3,
+            user=self.user
+        )
+        recipe1.tags.add(tag)
+        recipe2 = Recipe.objects.create(
+            title='Porridge',
+            price=2,
+            time_minutes=3,
+            user=self.user
+        )
+        recipe2.tags.add(tag)
+
+        res = self.client.get(TAGS_URL, {'assigned_only': 1})
+
+        self.assertEqual(len(res.data['results']), 1)
+
+    def test_assigned_tags_limited_to_user(self):
+        """Test assigned tags of other users are not returned"""
+        user2 = get_user_model().objects.create_user(
+            'test2@test.com',
+            'testtest'
+        )
+        tag = Tag.objects.create(user=user2, name='fruity')
+        recipe = Recipe.objects.create(
+            title='Fruit salad',
+            price=5,
+            time_minutes=3,
+            user=user2
+        )
+        recipe.tags.add(tag)
+
+        res = self.client.get(TAGS_URL, {'assigned_only': 1})
+
+        self.assertEqual(res.data['results'], [])
+
+    def test_retrieve_tags_with_counts(self):
+        """Test tags can be annotated with their recipe count"""
+        tag1 = Tag.objects.create(user=self.user, name='breakfast')
+        tag2 = Tag.objects.create(user=self.user, name='lunch')
+        recipe = Recipe.objects.create(
+            title='Pancakes',
+            price=5,
+            time_minutes=3,
+            user=self.user
+        )
+        recipe.tags.add(tag1)
+
+        res = self.client.get(TAGS_URL, {'with_counts': 1})
+
+        self.assertEqual(res.data['results'], [
+            {'id': tag2.id, 'name': tag2.name, 'recipe_count': 0},
+            {'id': tag1.id, 'name': tag1.name, 'recipe_count': 1},
+        ])
+
+    def test_retrieve_tags_paginated_on_equal_names(self):
+        """Test pages of tags with equal names neither skip nor repeat"""
+        tags = [Tag.objects.create(user=self.user, name='vegan')]
+        for i in range(4):
+            tags.append(Tag.objects.create(user=self.user, name='salty'))
+        tags.append(Tag.objects.create(user=self.user, name='dessert'))
+
+        ids = []
+        res = self.client.get(TAGS_URL, {'page_size': 2})
+        pages = [res]
+        while res.data['next']:
+            ids += [tag['id'] for tag in res.data['results']]
+            # positioned on (name, id), never on an offset
+            cursor = parse_qs(urlparse(res.data['next']).query)['cursor']
+            self.assertNotIn(b'o=', b64decode(cursor[0]))
+            res = self.client.get(res.data['next'])
+            pages.append(res)
+        ids += [tag['id'] for tag in res.data['results']]
+        self.assertEqual(ids, [tag.id for tag in tags])
+
+        res = self.client.get(pages[-1].data['previous'])
+        self.assertEqual(res.data['results'], pages[-2].data['results'])
+
+    def test_retrieve_tags_invalid_cursor(self):
+        """Test a malformed cursor position returns 404"""
+        res = self.client.get(TAGS_URL, {'cursor': 'cD1ub3Rqc29u'})
+
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
@@ -0,0 +1,204 @@
+import os
+import re
+import tempfile
+import time
+import uuid
+
+from PIL import Image
+
+from django.conf import settings
+from django.core.files.uploadhandler import TemporaryFileUploadHandler
+from django.utils.translation import gettext_lazy as _
+
+from rest_framework import exceptions, status
+
+
+CONTENT_RANGE_RE = re.compile(r'^bytes (\d+)-(\d+)/(\d+)$')
+
+UPLOAD_ID_RE = re.compile(r'^[0-9a-f]{32}$')
+
+ALLOWED_FORMATS = {'JPEG': 'jpg', 'PNG': 'png', 'GIF': 'gif', 'WEBP': 'webp'}
+
+# bytes read from the request body at a time
+CHUNK_SIZE = 64 * 1024
+
+# bytes of a first chunk large enough to hold any image header
+HEADER_SIZE = 2 * CHUNK_SIZE
+
+
+class UploadTooLarge(exceptions.APIException):
+    status_code = status.HTTP_413_REQUEST_ENTITY_TOO_LARGE
+    default_detail = _('Uploaded image is too large.')
+    default_code = 'too_large'
+
+
+class UploadOffsetMismatch(exceptions.APIException):
+    status_code = status.HTTP_409_CONFLICT
+    default_detail = _('Chunk does not start at the current upload offset.')
+    default_code = 'offset_mismatch'
+
+
+class LimitedTemporaryFileUploadHandler(TemporaryFileUploadHandler):
+    """Stream uploaded files to disk, aborting past the byte limit"""
+
+    def new_file(self, *args, **kwargs):
+        super().new_file(*args, **kwargs)
+        self.received = 0
+
+    def receive_data_chunk(self, raw_data, start):
+        self.received += len(raw_data)
+        if self.received > settings.RECIPE_IMAGE_MAX_BYTES:
+            self.file.close()
+            raise UploadTooLarge()
+
+        return super().receive_data_chunk(raw_data, start)
+
+
+def check_image_header(image_file):
+    """Validate an image from its header, without decoding the pixels
+
+    Returns the file extension matching the detected format.
+    """
+    try:
+        with Image.open(image_file) as image:
+            image_format = image.format
+            width, height = image.size
+    except Exception:
+        raise exceptions.ValidationError(
+            _('Upload a valid image. The file you uploaded was either not '
+              'an image or a corrupted image.')
+        )
+
+    if image_format not in ALLOWED_FORMATS:
+        raise exceptions.ValidationError(
+            _('Unsupported image format %s.') % image_format
+        )
+    if width * height > settings.RECIPE_IMAGE_MAX_PIXELS:
+        raise exceptions.ValidationError(
+            _('Image dimensions %(width)sx%(height)s are too large.') % {
+                'width': width,
+                'height': height,
+            }
+        )
+
+    return ALLOWED_FORMATS[image_format]
+
+
+def parse_content_range(header):
+    """Return (start, end, total) from a Content-Range header"""
+    match = CONTENT_RANGE_RE.match(header or '')
+    if not match:
+        raise exceptions.ParseError(
+            _('Expected a "Content-Range: bytes start-end/total" header.')
+        )
+    start, end, total = (int(value) for value in match.groups())
+    if end < start or end >= total:
+        raise exceptions.ParseError(_('Invalid Content-Range.'))
+
+    return start, end, total
+
+
+class ChunkedUpload:
+    """A resumable image upload assembled in a temporary file
+
+    Every upload has its own id, so concurrent uploads to one recipe do
+    not mix. The total size declared by the first chunk is kept next to
+    the data and later chunks must declare the same. Uploads untouched
+    for RECIPE_UPLOAD_EXPIRY seconds are deleted when another starts.
+    """
+
+    def __init__(self, recipe, upload_id=None):
+        if upload_id is None:
+            upload_id = uuid.uuid4().hex
+        elif not UPLOAD_ID_RE.match(upload_id):
+            raise exceptions.ParseError(_('Invalid upload_id.'))
+        self.id = upload_id
+        self.directory = os.path.join(
+            settings.FILE_UPLOAD_TEMP_DIR or tempfile.gettempdir(),
+            'recipe-uploads'
+        )
+        os.makedirs(self.directory, exist_ok=True)
+        self.path = os.path.join(
+            self.directory,
+            f'{recipe.pk}-{upload_id}.part'
+        )
+        self.total_path = f'{self.path}.total'
+
+    @property
+    def offset(self):
+        """Number of bytes received so far"""
+        try:
+            return os.path.getsize(self.path)
+        except FileNotFoundError:
+            return 0
+
+    def purge_expired(self):
+        """Delete the uploads of any recipe left untouched for too long"""
+        expired = time.time() - settings.RECIPE_UPLOAD_EXPIRY
+        for entry in os.scandir(self.directory):
+            try:
+                if entry.stat().st_mtime < expired:
+                    os.remove(entry.path)
+            except FileNotFoundError:
+                pass
+
+    def check_total(self, start, total):
+        """Record the total of a new upload or check it against it"""
+        if start == 0 and not self.offset:
+            self.purge_expired()
+            with open(self.total_path, 'w') as total_file:
+                total_file.write(str(total))
+            return
+
+        try:
+            with open(self.total_path) as total_file:
+                expected = int(total_file.read())
+        except (FileNotFoundError, ValueError):
+            raise UploadOffsetMismatch()
+        if total != expected:
+            raise exceptions.ParseError(
+                _('Content-Range total %(total)s differs from the '
+                  '%(expected)s bytes of the upload.') % {
+                    'total': total,
+                    'expected': expected,
+                }
+            )
+
+    def write(self, stream, start, end, total):
+        """Append the chunk [start, end] read from stream
+
+        Returns True once all `total` bytes have been received.
+        """
+        if total > settings.RECIPE_IMAGE_MAX_BYTES:
+            raise UploadTooLarge()
+        if start != self.offset:
+            raise UploadOffsetMismatch()
+        self.check_total(start, total)
+
+        remaining = end - start + 1
+        with open(self.path, 'ab') as part:
+            # without a body or Content-Length there is no stream at all
+            while remaining and stream is not None:
+                data = stream.read(min(CHUNK_SIZE, remaining))
+                if not data:
+                    break
+                part.write(data)
+                remaining -= len(data)
+
+        if remaining:
+            # keep what was received so the client can resume from offset
+            raise exceptions.ParseError(_('Chunk shorter than Content-Range.'))
+
+        return end + 1 == total
+
+    def open(self):
+        """Open the received bytes for reading"""
+        return open(self.path, 'rb')
+
+    def discard(self):
+        """Delete the partial upload"""
+        for path in (self.path, self.total_path):
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
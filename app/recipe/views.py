@@ -1,29 +1,70 @@
+from django.conf import settings
+from django.core.files import File
+from django.db.models import Prefetch
+from django.http import StreamingHttpResponse
+from django.utils.translation import gettext_lazy as _
+
 from rest_framework import viewsets, mixins, status
-from rest_framework.authentication import TokenAuthentication
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.decorators import action
+from rest_framework.exceptions import ParseError, ValidationError
 from rest_framework.response import Response
 
+from core.authentication import CachedTokenAuthentication
 from core.models import Tag, Ingredient, Recipe
+from core.tasks import enqueue
 
 from . import serializers
-
-
-class BaseRecipeViewSet(viewsets.GenericViewSet,
+from .exports import FORMATS, STREAMS
+from .fast_serializers import FastSerializer
+from .filters import filter_recipes, filter_assigned, \
+    annotate_recipe_count, param_to_bool
+from .mixins import BulkModelMixin, CachedListMixin, \
+    ConditionalGetMixin, FastSerializationMixin
+from .images import process_recipe_image
+from .uploads import ChunkedUpload, LimitedTemporaryFileUploadHandler, \
+    check_image_header, parse_content_range, HEADER_SIZE
+from .pagination import RecipeCursorPagination, NameCursorPagination
+from .search import search_recipes
+
+
+class BaseRecipeViewSet(BulkModelMixin,
+                        CachedListMixin,
+                        ConditionalGetMixin,
+                        viewsets.GenericViewSet,
                         mixins.ListModelMixin,
                         mixins.CreateModelMixin):
     """Base viewset for user owned recipe attributes """
-    authentication_classes = TokenAuthentication,
+    authentication_classes = CachedTokenAuthentication,
     permission_classes = IsAuthenticated,
+    pagination_class = NameCursorPagination
 
     def get_queryset(self):
         """Return objects  for the current Auth user"""
-        assigned_only = bool(self.request.query_params.get('assigned_only'))
-        queryset = self.queryset
-        if assigned_only:
-            return queryset.filter(recipe__isnull=False)
+        params = self.request.query_params
+        queryset = self.queryset.filter(user=self.request.user)
+        if param_to_bool('assigned_only', params.get('assigned_only')):
+            queryset = filter_assigned(
+                queryset,
+                self.recipe_through,
+                self.recipe_field
+            )
+        if param_to_bool('with_counts', params.get('with_counts')):
+            queryset = annotate_recipe_count(
+                queryset,
+                self.recipe_through,
+                self.recipe_field
+            )
+
+        return queryset.order_by('-name')
+
+    def get_serializer_class(self):
+        """Return the serializer including usage counts if requested"""
+        with_counts = self.request.query_params.get('with_counts')
+        if self.action == 'list' and param_to_bool('with_counts', with_counts):
+            return self.count_serializer_class
 
-        return queryset.filter(user=self.request.user).order_by('-name')
+        return self.serializer_class
 
     def perform_create(self, serializer):
         """create a new attribute"""
@@ -34,38 +75,62 @@ class TagViewSet(BaseRecipeViewSet):
     """Manage tags in the data base"""
     queryset = Tag.objects.all()
     serializer_class = serializers.TagSerializer
+    count_serializer_class = serializers.TagCountSerializer
+    recipe_through = Recipe.tags.through
+    recipe_field = 'tag_id'
 
 
 class IngredientViewSet(BaseRecipeViewSet):
     """Manage ingredients in the DataBase"""
     queryset = Ingredient.objects.all()
     serializer_class = serializers.IngredientSerializer
+    count_serializer_class = serializers.IngredientCountSerializer
+    recipe_through = Recipe.ingredients.through
+    recipe_field = 'ingredient_id'
 
 
-class RecipeViewSet(viewsets.ModelViewSet):
+class RecipeViewSet(BulkModelMixin,
+                    CachedListMixin,
+                    ConditionalGetMixin,
+                    FastSerializationMixin,
+                    viewsets.ModelViewSet):
     """Manage recipes in the database"""
     serializer_class = serializers.RecipeSerializer
     queryset = Recipe.objects.all()
-    authentication_classes = TokenAuthentication,
+    authentication_classes = CachedTokenAuthentication,
     permission_classes = IsAuthenticated,
-
-    def _params_to_ints(self, qs):
-        """convert lis of string id to list of integers"""
-        return [int(str_id) for str_id in qs.split(',')]
+    pagination_class = RecipeCursorPagination
 
     def get_queryset(self):
         """Retrieve the recipes for the authenticated user"""
-        tags = self.request.query_params.get('tags')
-        ingredients = self.request.query_params.get('ingredients')
-        queryset = self.queryset
-        if tags:
-            tag_ids = self._params_to_ints(tags)
-            queryset = queryset.filter(tags__id__in=tag_ids)
-        if ingredients:
-            ingredient_ids = self._params_to_ints(ingredients)
-            queryset = queryset.filter(ingredients__id__in=ingredient_ids)
-
-        return queryset.filter(user=self.request.user)
+        params = self.request.query_params
+        queryset = filter_recipes(self.queryset, params)
+        queryset = queryset.filter(user=self.request.user)
+        terms = params.get('q', '').strip()
+        if terms:
+            queryset = search_recipes(queryset, terms, self.request.user.pk)
+
+        return self._prefetch_related(queryset)
+
+    def _prefetch_related(self, queryset):
+        """Prefetch the relations rendered by the current action"""
+        if self.action == 'retrieve':
+            fields = ('id', 'name')
+        elif self.action == 'list':
+            fields = ('id',)
+        else:
+            return queryset
+
+        return queryset.prefetch_related(
+            Prefetch(
+                'tags',
+                queryset=Tag.objects.only(*fields).order_by('id')
+            ),
+            Prefetch(
+                'ingredients',
+                queryset=Ingredient.objects.only(*fields).order_by('id')
+            ),
+        )
 
     def get_serializer_class(self):
         """Return appropriate serializer class"""
@@ -80,17 +145,55 @@ class RecipeViewSet(viewsets.ModelViewSet):
         """Create a new recipe"""
         serializer.save(user=self.request.user)
 
-    @action(methods=['PATCH'], detail=True, url_path='upload-image')
+    @action(methods=['GET'], detail=False, url_path='export')
+    def export(self, request):
+        """Stream every recipe of the user with its tags and ingredients"""
+        output = request.query_params.get('output', 'json')
+        if output not in STREAMS:
+            raise ValidationError({
+                'output': _('Expected one of: %s.') % ', '.join(STREAMS)
+            })
+
+        queryset = self.filter_queryset(self.get_queryset()).order_by('id')
+        response = StreamingHttpResponse(
+            STREAMS[output](
+                FastSerializer(serializers.RecipeDetailSerializer),
+                queryset,
+                settings.RECIPE_EXPORT_CHUNK_SIZE
+            ),
+            content_type=FORMATS[output]
+        )
+        response['Content-Disposition'] = \
+            f'attachment; filename="recipes.{output}"'
+
+        return response
+
+    def _clear_image_variants(self, recipe):
+        """Delete the variants generated from the previous image"""
+        recipe.image_thumbnail.delete(save=False)
+        recipe.image_medium.delete(save=False)
+        recipe.image_status = Recipe.IMAGE_PENDING
+
+    @action(methods=['GET', 'PATCH'], detail=True, url_path='upload-image')
     def upload_image(self, request, pk=None):
-        """Upload an image to a recipe"""
+        """Upload an image to a recipe, or poll its processing status"""
         recipe = self.get_object()
+        if request.method == 'GET':
+            serializer = serializers.RecipeImageSerializer(recipe)
+            return Response(serializer.data)
+
+        request._request.upload_handlers = [
+            LimitedTemporaryFileUploadHandler(request._request)
+        ]
         serializer = serializers.RecipeImageSerializer(
             recipe,
             data=request.data
         )
 
         if serializer.is_valid():
+            self._clear_image_variants(recipe)
             serializer.save()
+            enqueue(process_recipe_image, recipe.id)
             return Response(
                 serializer.data,
                 status=status.HTTP_200_OK
@@ -100,3 +203,46 @@ class RecipeViewSet(viewsets.ModelViewSet):
             serializer.errors,
             status=status.HTTP_400_BAD_REQUEST
         )
+
+    @action(methods=['GET', 'PUT'], detail=True,
+            url_path='upload-image-chunk')
+    def upload_image_chunk(self, request, pk=None):
+        """Upload a recipe image in resumable Content-Range chunks
+
+        The first chunk starts an upload whose upload_id is returned;
+        the next chunks and offset queries pass it as a parameter.
+        """
+        recipe = self.get_object()
+        upload_id = request.query_params.get('upload_id')
+        if request.method == 'GET':
+            if upload_id is None:
+                raise ParseError(_('Expected an upload_id parameter.'))
+            upload = ChunkedUpload(recipe, upload_id)
+            return Response({'upload_id': upload.id, 'offset': upload.offset})
+        upload = ChunkedUpload(recipe, upload_id)
+
+        start, end, total = parse_content_range(
+            request.META.get('HTTP_CONTENT_RANGE')
+        )
+        complete = upload.write(request.stream, start, end, total)
+        if complete or (start == 0 and end + 1 >= HEADER_SIZE):
+            try:
+                with upload.open() as image_file:
+                    ext = check_image_header(image_file)
+            except ValidationError:
+                upload.discard()
+                raise
+        if not complete:
+            return Response(
+                {'upload_id': upload.id, 'offset': upload.offset},
+                status=status.HTTP_202_ACCEPTED
+            )
+
+        with upload.open() as image_file:
+            self._clear_image_variants(recipe)
+            recipe.image.save(f'image.{ext}', File(image_file))
+        upload.discard()
+        enqueue(process_recipe_image, recipe.id)
+        serializer = serializers.RecipeImageSerializer(recipe)
+
+        return Response(serializer.data, status=status.HTTP_200_OK)
@@ -1,13 +1,23 @@
-from django.test import TestCase
+from datetime import timedelta
+from unittest.mock import patch
+
+from django.test import TestCase, override_settings
 from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.conf import settings
 from django.urls import reverse
+from django.utils import timezone
 
+from rest_framework.authtoken.models import Token
 from rest_framework.test import APIClient
 from rest_framework import status
 
+from core.throttling import login_buckets
+
 
 CREATE_USER_URL = reverse('user:create')
 TOKEN_URL = reverse('user:token')
+ROTATE_TOKEN_URL = reverse('user:token-rotate')
 ME_URL = reverse('user:me')
 
 
@@ -19,6 +29,7 @@ class UserApiTests(TestCase):
     """ Test users Api """
     def setUp(self):
         self.client = APIClient()
+        self.addCleanup(login_buckets.clear)
 
     def test_create_valid_user_success(self):
         """test creating user with valid payload is successful"""
@@ -72,6 +83,57 @@ class UserApiTests(TestCase):
         self.assertIn('token', res.data)
         self.assertEqual(res.status_code, status.HTTP_200_OK)
 
+    @override_settings(PASSWORD_HASHERS=[
+        'django.contrib.auth.hashers.MD5PasswordHasher',
+        'django.contrib.auth.hashers.PBKDF2PasswordHasher',
+    ])
+    def test_create_token_upgrades_password_hash(self):
+        """Test a login rehashes an old hash with the preferred hasher"""
+        user = create_user(email='test@test.com')
+        user.password = make_password('testtest', hasher='pbkdf2_sha256')
+        user.save()
+
+        res = self.client.post(TOKEN_URL, {
+            'email': 'test@test.com',
+            'password': 'testtest'
+        })
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        user.refresh_from_db()
+        self.assertTrue(user.password.startswith('md5$'))
+        self.assertTrue(user.check_password('testtest'))
+
+    @override_settings(TOKEN_TTL=60)
+    def test_create_token_reissues_expired(self):
+        """Test logging in replaces an expired token"""
+        payload = {'email': 'test@test.com', 'password': 'testtest'}
+        user = create_user(**payload)
+        expired = Token.objects.create(user=user)
+        Token.objects.filter(pk=expired.pk).update(
+            created=timezone.now() - timedelta(seconds=61)
+        )
+
+        res = self.client.post(TOKEN_URL, payload)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(res.data['token'], expired.key)
+        self.assertEqual(Token.objects.get(user=user).key, res.data['token'])
+        self.assertIsNotNone(res.data['expires'])
+
+    def test_rotate_token(self):
+        """Test rotating a token replaces it by a new one"""
+        user = create_user(email='test@test.com', password='testtest')
+        token = Token.objects.create(user=user)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {token.key}')
+
+        res = self.client.post(ROTATE_TOKEN_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(Token.objects.get(user=user).key, res.data['token'])
+        self.assertNotEqual(res.data['token'], token.key)
+        res = self.client.get(ME_URL)
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
     def test_create_token_invalid_credentials(self):
         """test that token is not created if invalid credentials are given"""
         create_user(email='test@test.com', password='testtest')
@@ -106,6 +168,50 @@ class UserApiTests(TestCase):
         self.assertNotIn('token', res.data)
         self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
 
+    @patch('user.serializers.authenticate', return_value=None)
+    def test_create_token_throttled_by_email(self, mock_authenticate):
+        """Test logins over the email limit are rejected unchecked"""
+        payload = {'email': 'test@test.com', 'password': '123456'}
+        burst = settings.LOGIN_THROTTLE['EMAIL_BURST']
+        for _ in range(burst):
+            res = self.client.post(TOKEN_URL, payload)
+            self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+        res = self.client.post(TOKEN_URL, dict(payload, email='TEST@test.com'))
+
+        self.assertEqual(res.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+        self.assertIn('Retry-After', res)
+        self.assertEqual(mock_authenticate.call_count, burst)
+        res = self.client.post(
+            TOKEN_URL,
+            dict(payload, email='other@test.com')
+        )
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_create_token_not_an_object(self):
+        """Test a body that is not an object is rejected as invalid"""
+        for url in (TOKEN_URL, CREATE_USER_URL):
+            res = self.client.post(url, [1], format='json')
+
+            self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_create_user_throttled_by_ip(self):
+        """Test sign ups over the IP limit are rejected"""
+        for n in range(settings.LOGIN_THROTTLE['IP_BURST']):
+            self.client.post(CREATE_USER_URL, {'email': f'user{n}@test.com'})
+
+        res = self.client.post(CREATE_USER_URL, {
+            'email': 'test@test.com',
+            'password': 'testtest'
+        })
+
+        self.assertEqual(res.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+        self.assertFalse(
+            get_user_model().objects.filter(email='test@test.com').exists()
+        )
+        res = self.client.post(TOKEN_URL, {'email': 'test@test.com'})
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
     def test_retreive_user_unauthorized(self):
         """Auth is required"""
         res = self.client.get(ME_URL)
@@ -7,5 +7,10 @@ app_name = 'user'
 urlpatterns = [
     path("create/", views.CreateUserView.as_view(), name='create'),
     path("token/", views.CreateTokenView.as_view(), name='token'),
+    path(
+        "token/rotate/",
+        views.RotateTokenView.as_view(),
+        name='token-rotate'
+    ),
     path("me/", views.ManageUserView.as_view(), name='me'),
 ]
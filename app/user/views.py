@@ -1,26 +1,61 @@
-from rest_framework import generics, authentication, permissions
+from rest_framework import generics, permissions
 from rest_framework.authtoken.views import ObtainAuthToken
+from rest_framework.response import Response
 from rest_framework.settings import api_settings
+from rest_framework.views import APIView
+
+from core.authentication import CachedTokenAuthentication, issue_token, \
+    rotate_token, token_expires
+from core.throttling import LoginThrottle
 
 from .serializers import UserSerializer, AuthTokenSerializer
 
 
+def token_data(token):
+    """Return the response body for an issued token"""
+    return {'token': token.key, 'expires': token_expires(token)}
+
+
 class CreateUserView(generics.CreateAPIView):
     """Create a new user in the system"""
     serializer_class = UserSerializer
+    throttle_classes = LoginThrottle,
+    throttle_scope = 'create'
 
 
 class CreateTokenView(ObtainAuthToken):
     """create auth token for user"""
     serializer_class = AuthTokenSerializer
     renderer_classes = api_settings.DEFAULT_RENDERER_CLASSES
+    throttle_classes = LoginThrottle,
+    throttle_scope = 'token'
+
+    def post(self, request, *args, **kwargs):
+        """Return the token of the user, reissuing it once expired"""
+        serializer = self.serializer_class(
+            data=request.data,
+            context={'request': request}
+        )
+        serializer.is_valid(raise_exception=True)
+        token = issue_token(serializer.validated_data['user'])
+
+        return Response(token_data(token))
+
+
+class RotateTokenView(APIView):
+    """Replace the token of the authenticated user by a new one"""
+    permission_classes = permissions.IsAuthenticated,
+    authentication_classes = CachedTokenAuthentication,
+
+    def post(self, request, *args, **kwargs):
+        return Response(token_data(rotate_token(request.auth)))
 
 
 class ManageUserView(generics.RetrieveUpdateAPIView):
     """Manage the authenticated user"""
     serializer_class = UserSerializer
     permission_classes = permissions.IsAuthenticated,
-    authentication_classes = authentication.TokenAuthentication,
+    authentication_classes = CachedTokenAuthentication,
 
     def get_object(self):
         """Retrieve and return the Authenticated user"""